@@ -8,6 +8,8 @@ the following commands:
     * daemon - Run Elysia as a daemon.
     * init_systemd - Create a SystemD service file.
     * init_bash - Create a bash script for the SystemD service.
+    * bench - Run benchmarks and simulations against a temporary database.
+    * profile-startup - Report what importing and booting Elysia costs, module by module and phase by phase.
 """
 import click
 import os
@@ -109,6 +111,104 @@ def mvc(subcommand):
     execute_from_command_line([""] + sys.argv[2:])
 
 
+@elysia.group()
+def bench():
+    pass
+
+
+@bench.command()
+@click.option('--users', 'users', default=100)
+@click.option('--chores', 'chores', default=5, help="Chores per user.")
+@click.option('--accomplishments', 'accomplishments', default=3, help="Accomplishments per chore.")
+@click.option('--reminders', 'reminders', default=5, help="Reminders per user.")
+@click.option('--days', 'days', default=3.0, help="Days of simulated time.")
+@click.option('--tick', 'tick', default=60.0, help="Simulated seconds per tick.")
+@click.option('--latency', 'latency', default=0.0, help="Real seconds each fake REST call takes.")
+@click.option('--trace_memory', 'trace_memory', is_flag=True, default=False)
+@click.option('--output', 'output', default=None, help="Where to save the JSON report.")
+def advisor(users, chores, accomplishments, reminders, days, tick, latency, trace_memory, output):
+    import json
+    import tempfile
+    from elysia.bench.advisor import SimulationConfig, run
+    from elysia.bench.harness import save_report
+
+    config = SimulationConfig(
+        users=users,
+        chores=chores,
+        accomplishments=accomplishments,
+        reminders=reminders,
+        days=days,
+        tick=tick,
+        latency=latency,
+        trace_memory=trace_memory
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        report = run(config, os.path.join(directory, "bench.sqlite3"))
+
+    if output is not None:
+        save_report(report, output)
+        print(f"Report saved to {output}.")
+    else:
+        print(json.dumps(report, indent=4, default=str))
+
+
+@bench.command()
+@click.option('--size', 'sizes', multiple=True, type=int, default=[1000, 10000, 50000], help="Table sizes to measure at.")
+@click.option('--chunk_size', 'chunk_size', default=1000)
+@click.option('--output', 'output', default=None, help="Where to save the JSON report.")
+def iteration(sizes, chunk_size, output):
+    import json
+    import tempfile
+    from elysia.bench.iteration import run
+    from elysia.bench.harness import save_report
+
+    with tempfile.TemporaryDirectory() as directory:
+        report = run(sizes, chunk_size, os.path.join(directory, "bench.sqlite3"))
+
+    if output is not None:
+        save_report(report, output)
+        print(f"Report saved to {output}.")
+    else:
+        print(json.dumps(report, indent=4, default=str))
+
+
+@bench.command()
+@click.option('--iterations', 'iterations', default=100000)
+@click.option('--output', 'output', default=None, help="Where to save the JSON report.")
+def fields(iterations, output):
+    import json
+    import tempfile
+    from elysia.bench.fields import run
+    from elysia.bench.harness import save_report
+
+    with tempfile.TemporaryDirectory() as directory:
+        report = run(iterations, os.path.join(directory, "bench.sqlite3"))
+
+    if output is not None:
+        save_report(report, output)
+        print(f"Report saved to {output}.")
+    else:
+        print(json.dumps(report, indent=4, default=str))
+
+
+@elysia.command(name="profile-startup")
+@click.option('--top', 'top', default=25, help="How many of the slowest modules and packages to report.")
+@click.option('--output', 'output', default=None, help="Where to save the JSON report.")
+def profile_startup(top, output):
+    import json
+    from elysia.bench.startup import run
+    from elysia.bench.harness import save_report
+
+    report = run(conf, top=top)
+
+    if output is not None:
+        save_report(report, output)
+        print(f"Report saved to {output}.")
+    else:
+        print(json.dumps(report, indent=4, default=str))
+
+
 @elysia.command()
 def run():
     main()
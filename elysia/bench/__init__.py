@@ -0,0 +1,15 @@
+"""Benchmarks
+
+Simulations and benchmarks which run Elysia's code against a throwaway
+database and a fake bot, so that its performance can be measured without
+Discord, and without waiting for real time to pass. Everything in here is
+run through `python . bench`, apart from the startup profiler, which is run
+through `python . profile-startup`.
+
+    * harness - Shared pieces of every benchmark: the temporary database, query counting and reporting
+    * fakes - Fake GatewayBot which records what would have been sent to Discord
+    * advisor - Virtual clock simulation of the chore and reminder daemons
+    * iteration - Memory benchmark of streamed and fully materialized queryset iteration
+    * fields - Microbenchmark of resolving Discord ID fields
+    * startup - Profiler of import costs and boot phase timings
+"""
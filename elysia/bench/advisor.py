@@ -0,0 +1,291 @@
+"""Module defining the advisor simulation
+
+The chore and reminder daemons only do anything interesting when something
+comes due, which in real time means hours or days between events. This
+simulation seeds a temporary database with users, chores, accomplishments
+and reminders, installs a virtual clock, and then ticks both daemons
+through days of simulated time as fast as they'll go, recording what it
+cost them.
+
+    * SimulationConfig - Dataclass holding the parameters of a simulation
+    * seed - Function filling the database with simulated users and their chores and reminders
+    * simulate - Coroutine ticking the advisor daemons through simulated time, and reporting on them
+    * run - Function setting up and running a whole simulation
+"""
+from __future__ import annotations
+import asyncio
+import collections
+import dataclasses
+import datetime
+import tracemalloc
+import typing as t
+
+from .fakes import FakeBot
+from .harness import setup_database, QueryCounter, get_percentiles, get_max_rss
+from ..lib.clock import VirtualClock
+
+
+# Simulated users get IDs counting up from here, so they look like snowflakes.
+FIRST_USER_ID: int = 100000000000000000
+# How far back accomplishments are spread out before the simulation starts.
+HISTORY: datetime.timedelta = datetime.timedelta(days=7)
+
+
+@dataclasses.dataclass
+class SimulationConfig:
+    users: int = 100
+    # These are all per user, or in the case of accomplishments, per chore.
+    chores: int = 5
+    accomplishments: int = 3
+    reminders: int = 5
+
+    days: float = 3.0
+    # Simulated seconds between daemon ticks.
+    tick: float = 60.0
+    # Real seconds every fake REST call takes.
+    latency: float = 0.0
+    coalesce_window: float = 0.01
+    trace_memory: bool = False
+
+    notify_times: t.Tuple[str, ...] = ("every 1 day at 9:00", "every 1 day at 18:00")
+    frequencies: t.Tuple[str, ...] = ("every 2 days", "every 1 week at 9:00", "every tuesday")
+    rules: t.Tuple[str, ...] = ("every 12 minutes", "every 2 days", "every friday at 23:45")
+
+    def validate(self) -> None:
+        from ..lib.rules import compile_rule
+
+        for rule in (*self.notify_times, *self.frequencies, *self.rules):
+            if compile_rule(rule) is None:
+                raise ValueError(f"'{rule}' is not a valid rule.")
+        if self.tick <= 0:
+            raise ValueError("The tick length must be greater than 0.")
+
+
+def seed(config: SimulationConfig, clock: VirtualClock, bot: FakeBot) -> t.Dict[str, int]:
+    """
+    Fill the database with simulated users, chores and reminders.
+
+    The clock is expected to sit `HISTORY` before the start of the
+    simulation. Accomplishments are spread out over that window, which
+    leaves the clock at the start of the simulation once this returns.
+    Everything is bulk created, with the denormalized due state computed
+    here, since bulk creation skips the model hooks which would normally
+    do that.
+    """
+    from django.db import transaction
+    from ..mvc.advisor.models import Accomplishment, Chore, NotifySchedule, Reminder
+    from ..mvc.discord.models import User
+    from ..mvc.threats.models import PartOfSpeech
+
+    start = clock.now() + HISTORY
+
+    with transaction.atomic():
+        PartOfSpeech.objects.bulk_create([
+            PartOfSpeech(type=PartOfSpeech.Type.VERB, value="delete"),
+            PartOfSpeech(type=PartOfSpeech.Type.DIRECT_OBJECT, value="your save files"),
+        ])
+
+        users = User.objects.bulk_create([
+            User(
+                id=FIRST_USER_ID + i,
+                chore_daemon=True,
+                notify_times=", ".join(config.notify_times),
+                last_notify=start
+            )
+            for i in range(config.users)
+        ])
+        for user in users:
+            bot.cache.add_user(user.id)
+
+        schedules = []
+        for user in users:
+            for time in NotifySchedule.parse(user.notify_times):
+                schedules.append(NotifySchedule(user=user, time=time, next_notify_at=NotifySchedule.get_next(user, time)))
+        NotifySchedule.objects.bulk_create(schedules)
+
+        chores = []
+        for i, user in enumerate(users):
+            for j in range(config.chores):
+                frequency = config.frequencies[(i + j) % len(config.frequencies)]
+                chores.append(Chore(name=f"Chore {i}-{j}", frequency=frequency, assign_to=user))
+
+        rounds = []
+        for _ in range(config.accomplishments):
+            clock.advance(HISTORY / config.accomplishments)
+            rounds.append(Accomplishment.objects.bulk_create([Accomplishment(user=chore.assign_to) for chore in chores]))
+        clock.advance(start - clock.now())
+
+        if rounds:
+            for chore, accomplishment in zip(chores, rounds[-1]):
+                chore.last_accomplished_at = accomplishment.utc_timestamp
+                chore.update_next_due_at()
+        Chore.objects.bulk_create(chores)
+
+        through = Chore.accomplishments.through
+        through.objects.bulk_create([
+            through(chore_id=chore.id, accomplishment_id=accomplishments[k].id)
+            for accomplishments in rounds
+            for k, chore in enumerate(chores)
+        ])
+
+        reminders = []
+        for i, user in enumerate(users):
+            for j in range(config.reminders):
+                reminder = Reminder(
+                    user=user,
+                    rule=config.rules[(i + j) % len(config.rules)],
+                    recurring=True,
+                    text=f"Reminder {i}-{j}",
+                    utc_last_notify=start
+                )
+                reminder._timezone = user.timezone
+                reminder.update_next_fire_at()
+                reminders.append(reminder)
+        Reminder.objects.bulk_create(reminders)
+
+    return {
+        'users': len(users),
+        'notify_schedules': len(schedules),
+        'chores': len(chores),
+        'accomplishments': len(chores) * len(rounds),
+        'reminders': len(reminders),
+    }
+
+
+async def simulate(config: SimulationConfig, clock: VirtualClock, bot: FakeBot) -> t.Dict[str, t.Any]:
+    """
+    Tick the advisor daemons through `config.days` of simulated time.
+
+    The daemons' callbacks are called directly, rather than through their
+    service loops, so that the clock only moves between ticks. The first
+    call of each is reported separately, since that's when they seed their
+    schedules and backfill whatever needs backfilling.
+    """
+    from ..daemons import advisor
+    from ..lib.executor import ExecutorMetrics
+    from ..lib.rules import get_stats
+    from ..mvc.advisor.models import Notification, ReminderDelivery
+
+    advisor.dm_coalescer.window = config.coalesce_window
+    # Time only passes between ticks, so the reminder daemon must never sleep.
+    advisor.reminder_scheduler.max_sleep = 0
+    for executor in (advisor.chore_executor, advisor.reminder_executor):
+        executor.metrics = ExecutorMetrics(lags=collections.deque())
+
+    daemons = [advisor.chore_daemon(), advisor.reminder_daemon()]
+    for daemon in daemons:
+        daemon.attach_bot(bot)
+
+    loop = asyncio.get_running_loop()
+    counter = QueryCounter().install()
+
+    try:
+        startup = {}
+        for daemon in daemons:
+            snapshot = counter.snapshot()
+            start = loop.time()
+            await daemon._callback(bot)
+            startup[daemon.name] = {'wall_seconds': loop.time() - start, **counter.since(snapshot)}
+
+        ticks = int(config.days * 86400 // config.tick)
+        notified_at_startup = await Notification.objects.acount()
+        tick_durations: t.List[float] = []
+        daemon_durations: t.Dict[str, t.List[float]] = {daemon.name: [] for daemon in daemons}
+        daemon_writes: t.Dict[str, int] = {daemon.name: 0 for daemon in daemons}
+        queries: t.List[int] = []
+        writes: t.List[int] = []
+
+        simulation_start = loop.time()
+        for _ in range(ticks):
+            clock.advance(datetime.timedelta(seconds=config.tick))
+            snapshot = counter.snapshot()
+            tick_start = loop.time()
+
+            for daemon in daemons:
+                daemon_snapshot = counter.snapshot()
+                start = loop.time()
+                await daemon._callback(bot)
+                daemon_durations[daemon.name].append(loop.time() - start)
+                daemon_writes[daemon.name] += counter.since(daemon_snapshot)['writes']
+
+            tick_durations.append(loop.time() - tick_start)
+            cost = counter.since(snapshot)
+            queries.append(cost['queries'])
+            writes.append(cost['writes'])
+        wall = loop.time() - simulation_start
+    finally:
+        counter.uninstall()
+
+    notifications = await Notification.objects.acount() - notified_at_startup
+    deliveries = {state.name.lower(): 0 for state in ReminderDelivery.State}
+    async for state in ReminderDelivery.objects.values_list("state", flat=True):
+        deliveries[ReminderDelivery.State(state).name.lower()] += 1
+
+    return {
+        'startup': startup,
+        'ticks': {
+            'count': ticks,
+            'tick_seconds': config.tick,
+            'wall_seconds': wall,
+            'ticks_per_second': ticks / wall if wall else None,
+            'speedup': ticks * config.tick / wall if wall else None,
+            'duration': get_percentiles(tick_durations),
+            'daemons': {name: get_percentiles(durations) for name, durations in daemon_durations.items()},
+            'queries': get_percentiles(queries),
+            'writes': get_percentiles(writes),
+            'total_queries': sum(queries),
+            'total_writes': sum(writes),
+            'daemon_writes': daemon_writes,
+        },
+        # Lags are in simulated seconds, so they include up to a tick of granularity.
+        'delivery': {
+            'chore': {**advisor.chore_executor.metrics.as_dict(), 'lag': get_percentiles(advisor.chore_executor.metrics.lags)},
+            'notifications': notifications,
+            'writes_per_notification': daemon_writes['chore'] / notifications if notifications else None,
+            'reminder': {**advisor.reminder_executor.metrics.as_dict(), 'lag': get_percentiles(advisor.reminder_executor.metrics.lags)},
+            # Everything claimed since seeding, including at startup. Anything still
+            # pending or failed at the end is something the daemon didn't deliver.
+            'reminder_deliveries': deliveries,
+            'reminders_scheduled': len(advisor.reminder_scheduler),
+            'messages': advisor.dm_coalescer.messages_sent,
+            'embeds': advisor.dm_coalescer.embeds_sent,
+            'rest_calls': dict(bot.rest.calls),
+        },
+        'caches': {name: {**dataclasses.asdict(stats), 'ratio': stats.ratio} for name, stats in get_stats().items()},
+    }
+
+
+def run(config: SimulationConfig, database: str) -> t.Dict[str, t.Any]:
+    """
+    Run a whole simulation against a fresh database at the passed path.
+
+    Returns the report, which apart from what `simulate()` reports contains
+    the configuration, what was seeded, and how much memory it all took.
+    """
+    setup_database(database)
+    config.validate()
+
+    start = datetime.datetime.now(datetime.UTC).replace(second=0, microsecond=0)
+    bot = FakeBot(latency=config.latency)
+
+    with VirtualClock(start - HISTORY) as clock:
+        seeded = seed(config, clock, bot)
+
+        if config.trace_memory:
+            tracemalloc.start()
+        try:
+            report = asyncio.run(simulate(config, clock, bot))
+            peak = tracemalloc.get_traced_memory()[1] if config.trace_memory else None
+        finally:
+            if config.trace_memory:
+                tracemalloc.stop()
+
+    return {
+        'config': dataclasses.asdict(config),
+        'seeded': seeded,
+        **report,
+        'memory': {
+            'traced_peak_bytes': peak,
+            'max_rss_kb': get_max_rss(),
+        },
+    }
@@ -0,0 +1,109 @@
+"""Module defining the fake bot
+
+The daemons only ever use a small part of the GatewayBot: the cache and
+REST client to resolve users, `User.send()` to DM them, and the REST
+budget. The fakes in here stand in for those, and record what would have
+gone out to Discord instead of sending it.
+
+    * FakeMessage - Class standing in for a sent message
+    * FakeUser - Class standing in for a user, recording the DMs sent to it
+    * FakeCache - Class standing in for the bot's cache
+    * FakeREST - Class standing in for the bot's REST client, counting calls made to it
+    * FakeBot - Class standing in for the GatewayBot
+"""
+from __future__ import annotations
+import asyncio
+import collections
+import dataclasses
+import datetime
+import itertools
+import typing as t
+
+from ..lib.rest import RESTBudget
+from ..lib.utils import utcnow
+
+
+_message_ids = itertools.count(1)
+
+
+@dataclasses.dataclass
+class FakeMessage:
+    id: int
+    channel_id: int
+    embeds: t.List[t.Any]
+    timestamp: datetime.datetime
+
+
+class FakeUser:
+    def __init__(self, bot: FakeBot, id: int) -> None:
+        self._bot: FakeBot = bot
+        self.id: int = id
+        self.username: str = f"user{id}"
+        self.discriminator: str = "0000"
+
+    async def send(self, content: t.Any=None, *, embeds: t.Sequence[t.Any]=(), **kwargs) -> FakeMessage:
+        return await self._bot.rest.create_message(self.id, content, embeds=embeds or [kwargs.get('embed')])
+
+
+class FakeCache:
+    def __init__(self, bot: FakeBot) -> None:
+        self._bot: FakeBot = bot
+        self.users: t.Dict[int, FakeUser] = {}
+
+    def add_user(self, id: int) -> FakeUser:
+        user = FakeUser(self._bot, id)
+        self.users[id] = user
+        return user
+
+    def get_user(self, id: int) -> t.Optional[FakeUser]:
+        return self.users.get(int(id))
+
+    def get_guild(self, id: int) -> None:
+        return None
+
+    def get_guild_channel(self, id: int) -> None:
+        return None
+
+    def get_role(self, id: int) -> None:
+        return None
+
+    def get_guilds_view(self) -> t.Dict[int, t.Any]:
+        return {}
+
+
+class FakeREST:
+    """
+    Fake REST client.
+
+    Args:
+        bot (FakeBot): The bot this client belongs to.
+        latency (float): How long in real seconds every call takes.
+    """
+    def __init__(self, bot: FakeBot, latency: float=0.0) -> None:
+        self._bot: FakeBot = bot
+        self.latency: float = latency
+        self.calls: t.Counter[str] = collections.Counter()
+        self.messages: t.List[FakeMessage] = []
+
+    async def _call(self, name: str) -> None:
+        self.calls[name] += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    async def fetch_user(self, id: int) -> FakeUser:
+        await self._call("fetch_user")
+        return self._bot.cache.get_user(id) or FakeUser(self._bot, id)
+
+    async def create_message(self, channel: int, content: t.Any=None, *, embeds: t.Sequence[t.Any]=()) -> FakeMessage:
+        await self._call("create_message")
+        message = FakeMessage(next(_message_ids), channel, list(embeds), utcnow())
+        self.messages.append(message)
+        return message
+
+
+class FakeBot:
+    def __init__(self, latency: float=0.0) -> None:
+        self.cache: FakeCache = FakeCache(self)
+        self.rest: FakeREST = FakeREST(self, latency=latency)
+        # Big enough that the simulation is never held back by it.
+        self.rest_budget: RESTBudget = RESTBudget(rate=1e9, capacity=1e9)
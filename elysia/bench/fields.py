@@ -0,0 +1,60 @@
+"""Module defining the ID field resolution microbenchmark
+
+Models look up their Discord ID fields from a per-class registry when
+resolving. This benchmark compares that against working the fields out
+from the model's metadata on every call, the way resolution used to, on
+User, Channel and Role instances.
+
+    * legacy_resolve_all - Function resolving an instance the old way, by inspecting its fields on every call
+    * run - Function running the microbenchmark
+"""
+from __future__ import annotations
+import timeit
+import typing as t
+
+from .fakes import FakeBot
+from .harness import setup_database
+
+
+def legacy_resolve_all(instance, bot) -> None:
+    from ..mvc.discord.fields import BaseIDField
+
+    instance.attach_bot(bot)
+    for name in instance._get_field_expression_map(instance._meta).keys():
+        if name == "pk":
+            continue
+        field = getattr(instance.__class__, name)
+        if isinstance(field, property):
+            continue
+        field = field.field
+        if isinstance(field, BaseIDField):
+            instance._resolved[name] = field.resolve(instance.bot, getattr(instance, name))
+
+
+def run(iterations: int, database: str) -> t.Dict[str, t.Any]:
+    setup_database(database)
+
+    from ..mvc.discord.models import User, Channel, Role
+
+    bot = FakeBot()
+    bot.cache.add_user(1)
+    instances = [
+        User(id=1),
+        Channel(id=2, type="GUILD_TEXT", guild_id=3),
+        Role(id=4, guild_id=3),
+    ]
+
+    results = {}
+    for instance in instances:
+        legacy = timeit.timeit(lambda: legacy_resolve_all(instance, bot), number=iterations)
+        registry = timeit.timeit(lambda: instance.resolve_all(bot), number=iterations)
+        results[instance.__class__.__name__] = {
+            'legacy_us': legacy / iterations * 1e6,
+            'registry_us': registry / iterations * 1e6,
+            'speedup': legacy / registry if registry else None,
+        }
+
+    return {
+        'iterations': iterations,
+        'results': results,
+    }
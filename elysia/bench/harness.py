@@ -0,0 +1,126 @@
+"""Module defining the benchmark harness
+
+    * setup_database - Function pointing Django at a temporary SQLite database and creating every table in it
+    * QueryCounter - Class counting the SQL statements executed by Django, split into reads and writes
+    * get_percentiles - Function summarizing a list of samples
+    * save_report - Function writing a benchmark report out as JSON
+"""
+from __future__ import annotations
+import json
+import os
+import resource
+import threading
+import typing as t
+
+from ..lib.stats import percentile
+
+
+WRITE_STATEMENTS: t.Tuple[str, ...] = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def setup_database(path: str) -> None:
+    """
+    Configure Django to use the SQLite database at the passed path, and create
+    every table in it.
+
+    This has to be called before anything touching the models is imported.
+    Apps without migrations get their tables straight from the models, so
+    the benchmark sees the current schema even if `makemigrations` hasn't
+    been run since the models last changed.
+    """
+    from ..mvc.core import settings
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    settings.DATABASES["default"]["NAME"] = path
+    settings.configure()
+
+    from django.core.management import call_command
+    call_command("migrate", run_syncdb=True, verbosity=0)
+
+
+class QueryCounter:
+    """
+    Counter of every SQL statement Django executes, from any thread.
+
+    Django's own query logging is per connection, and connections are per
+    thread, which misses everything run through sync_to_async. This patches
+    the cursor wrapper itself instead, so nothing gets past it.
+    """
+    def __init__(self) -> None:
+        self.reads: int = 0
+        self.writes: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._originals: t.Dict[str, t.Callable] = {}
+
+    @property
+    def total(self) -> int:
+        return self.reads + self.writes
+
+    def snapshot(self) -> t.Tuple[int, int]:
+        return self.reads, self.writes
+
+    def since(self, snapshot: t.Tuple[int, int]) -> t.Dict[str, int]:
+        reads = self.reads - snapshot[0]
+        writes = self.writes - snapshot[1]
+        return {'queries': reads + writes, 'reads': reads, 'writes': writes}
+
+    def _count(self, sql: str, statements: int=1) -> None:
+        with self._lock:
+            if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+                self.writes += statements
+            else:
+                self.reads += statements
+
+    def install(self) -> QueryCounter:
+        from django.db.backends.utils import CursorWrapper
+
+        counter = self
+        execute = CursorWrapper.execute
+        executemany = CursorWrapper.executemany
+
+        def counted_execute(self, sql, params=None):
+            counter._count(sql)
+            return execute(self, sql, params)
+
+        def counted_executemany(self, sql, param_list):
+            counter._count(sql)
+            return executemany(self, sql, param_list)
+
+        self._originals = {'execute': execute, 'executemany': executemany}
+        CursorWrapper.execute = counted_execute
+        CursorWrapper.executemany = counted_executemany
+        return self
+
+    def uninstall(self) -> None:
+        from django.db.backends.utils import CursorWrapper
+
+        for name, original in self._originals.items():
+            setattr(CursorWrapper, name, original)
+        self._originals = {}
+
+
+def get_percentiles(samples: t.Iterable[float]) -> t.Dict[str, t.Optional[float]]:
+    samples = sorted(samples)
+    if not samples:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+
+    return {
+        'count': len(samples),
+        'mean': sum(samples) / len(samples),
+        'p50': percentile(samples, 50, is_sorted=True),
+        'p95': percentile(samples, 95, is_sorted=True),
+        'p99': percentile(samples, 99, is_sorted=True),
+        'max': samples[-1],
+    }
+
+
+def get_max_rss() -> int:
+    """The peak resident set size of this process, in kilobytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def save_report(report: t.Dict[str, t.Any], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4, default=str)
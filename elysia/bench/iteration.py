@@ -0,0 +1,76 @@
+"""Module defining the queryset iteration benchmark
+
+Iterating a DiscordQuerySet asynchronously fetches it a page at a time,
+rather than loading the whole table first. This benchmark grows the users
+table step by step, and at every size measures the peak memory and time
+it takes to iterate it both ways.
+
+    * measure - Coroutine measuring the peak traced memory and duration of a coroutine
+    * benchmark - Coroutine growing the users table and measuring both kinds of iteration at every size
+    * run - Function running the whole benchmark against a fresh database
+"""
+from __future__ import annotations
+import asyncio
+import time
+import tracemalloc
+import typing as t
+
+from .harness import setup_database
+
+
+async def measure(func: t.Callable[[], t.Awaitable[int]]) -> t.Dict[str, t.Any]:
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    rows = await func()
+    return {
+        'rows': rows,
+        'seconds': time.perf_counter() - start,
+        'peak_bytes': tracemalloc.get_traced_memory()[1] - baseline,
+    }
+
+
+async def benchmark(sizes: t.Sequence[int], chunk_size: int) -> t.List[t.Dict[str, t.Any]]:
+    from asgiref.sync import sync_to_async
+    from ..mvc.discord.models import User
+    from .advisor import FIRST_USER_ID
+
+    async def streamed() -> int:
+        count = 0
+        async for _ in User.objects.all().chunked(chunk_size):
+            count += 1
+        return count
+
+    async def materialized() -> int:
+        users = await sync_to_async(list)(User.objects.all())
+        return len(users)
+
+    results = []
+    seeded = 0
+    for size in sorted(sizes):
+        users = [User(id=FIRST_USER_ID + i) for i in range(seeded, size)]
+        await sync_to_async(User.objects.bulk_create)(users, batch_size=1000)
+        seeded = max(seeded, size)
+        del users
+
+        results.append({
+            'rows': seeded,
+            'streamed': await measure(streamed),
+            'materialized': await measure(materialized),
+        })
+    return results
+
+
+def run(sizes: t.Sequence[int], chunk_size: int, database: str) -> t.Dict[str, t.Any]:
+    setup_database(database)
+
+    tracemalloc.start()
+    try:
+        results = asyncio.run(benchmark(sizes, chunk_size))
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'chunk_size': chunk_size,
+        'results': results,
+    }
@@ -0,0 +1,152 @@
+"""Module defining the startup profiler
+
+Every reinit starts a brand new interpreter, so everything imported and
+built before the bot connects is paid again each time. This profiler
+imports the bot in a fresh interpreter under `-X importtime` to see what
+each module costs, then times each phase of the boot which can run without
+Discord. The stages after that are timed by the bot itself, and logged
+every time it boots.
+
+    * HEAVY_MODULES - Modules which are only imported on first use, and shouldn't show up at boot
+    * parse_importtime - Function parsing the output of `python -X importtime` into per-module costs
+    * profile_imports - Function importing the bot in a fresh interpreter and reporting what every module cost
+    * profile_phases - Function timing each phase of the boot which doesn't need a Discord connection
+    * run - Function running the whole profile
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import io
+import subprocess
+import sys
+import time
+import typing as t
+
+
+# Importing the bot shouldn't import any of these any more. aiohttp isn't
+# one of them, since hikari can't be imported without it.
+HEAVY_MODULES: t.Tuple[str, ...] = ("plotly", "PIL", "tornado")
+
+# Run in the fresh interpreter. Django has to be configured before the models are imported.
+IMPORT_SCRIPT: str = "from elysia.mvc.core.settings import configure; configure(); import elysia.core.bot"
+
+
+def parse_importtime(output: str) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Parse the output of `python -X importtime` into a list of modules.
+
+    Every module comes with its own import time, its cumulative import time
+    including everything it imported, and how deeply it was nested, all in
+    the order the imports finished.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        try:
+            own, cumulative, name = line[len("import time:"):].split("|")
+            own, cumulative = int(own), int(cumulative)
+        except ValueError:
+            # The header line.
+            continue
+
+        stripped = name.lstrip()
+        modules.append({
+            'module': stripped.strip(),
+            'self_us': own,
+            'cumulative_us': cumulative,
+            'depth': (len(name) - len(stripped) - 1) // 2,
+        })
+    return modules
+
+
+def profile_imports(root: str, top: int=25) -> t.Dict[str, t.Any]:
+    """
+    Import the bot in a fresh interpreter, and report what it cost.
+
+    Modules are ranked both by their own import time and by their
+    cumulative one, and the own import times of every module are also
+    summed per top level package, which is what shows which dependency is
+    worth deferring.
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+        cwd=root,
+        capture_output=True,
+        text=True
+    )
+    wall = time.perf_counter() - start
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing the bot failed:\n{process.stderr}")
+
+    modules = parse_importtime(process.stderr)
+    packages: t.Dict[str, int] = {}
+    for module in modules:
+        package = module['module'].split(".")[0]
+        packages[package] = packages.get(package, 0) + module['self_us']
+
+    imported = set([module['module'].split(".")[0] for module in modules])
+    return {
+        'wall_seconds': wall,
+        'modules': len(modules),
+        'total_seconds': sum([module['self_us'] for module in modules]) / 1e6,
+        'by_self': sorted(modules, key=lambda module: module['self_us'], reverse=True)[:top],
+        'by_cumulative': sorted(modules, key=lambda module: module['cumulative_us'], reverse=True)[:top],
+        'packages': dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]),
+        'heavy_modules_imported': [name for name in HEAVY_MODULES if name in imported],
+    }
+
+
+def profile_phases(conf) -> t.Dict[str, float]:
+    """
+    Time each phase of the boot which doesn't need a Discord connection.
+
+    These run in this process, so they have to run before anything else
+    imports the bot. Building the permission tree is timed, but syncing its
+    objects isn't, since that would write to the real database.
+    """
+    phases: t.Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(name: str) -> t.Iterator[None]:
+        start = time.perf_counter()
+        yield
+        phases[name] = time.perf_counter() - start
+
+    with phase("configure"):
+        from ..mvc.core.settings import configure
+        configure()
+
+    with phase("import"):
+        from ..core.bot import Bot
+        from ..lib.permissions import Node
+
+    with phase("construct"):
+        bot = Bot(conf)
+
+    with phase("banner"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            bot.print_banner()
+
+    with phase("commands"):
+        asyncio.run(bot.lightbulb.load_extensions("elysia.ext"))
+
+    with phase("permissions"):
+        Node.build_from_client(bot.lightbulb)
+
+    return phases
+
+
+def run(conf, top: int=25) -> t.Dict[str, t.Any]:
+    """Run the whole profile, returning the report."""
+    imports = profile_imports(str(conf.root_dir), top=top)
+    phases = profile_phases(conf)
+
+    return {
+        'imports': imports,
+        'phases': phases,
+        'total_seconds': sum(phases.values()),
+    }
@@ -1,4 +1,5 @@
 import asyncio
+import contextlib
 import datetime
 import hikari
 import lightbulb
@@ -7,6 +8,8 @@ import lolpython
 import miru
 import os
 import pyfiglet
+import time
+import typing as t
 import zoneinfo
 
 from .http import HTTPDaemon
@@ -17,12 +20,16 @@ from ..lib.injection import load_injection_for_commands
 from ..lib.permissions import Node, AccessIsDenied
 from ..lib.hooks import require_not_denied
 from ..daemons import run_daemons
-from ..mvc.discord.hooks import DiscordEventHandler
+from ..lib.daemon import DaemonSupervisor
+from ..lib.rest import RESTBudget, Priority
+from ..mvc.discord.hooks import DiscordEventHandler, reconciler
+from ..mvc.discord.ingest import ingest_queue
 
 
 class Bot(hikari.GatewayBot):
     def __init__(self, conf):
         self.conf: Config = conf
+        self._boot_started: float = time.monotonic()
         super().__init__(conf.token, intents=hikari.Intents.ALL, logs=None)
 
         # Bot attributes
@@ -32,6 +39,7 @@ class Bot(hikari.GatewayBot):
         self.last_connection: datetime.datetime | None = None
         self.version: str = f"{self.conf.version} '{self.conf.version_tag}'"
         self._permissions_root: Node | None = None
+        self.rest_budget: RESTBudget = RESTBudget()
 
         # Handle lightbulb
         self.lightbulb: lightbulb.Client = lightbulb.client_from_app(self, hooks=[require_not_denied])
@@ -43,9 +51,16 @@ class Bot(hikari.GatewayBot):
         # Handle HTTP Daemon
         self._http_daemon: HTTPDaemon | None = None
 
+        # Handle internal daemons
+        self._daemon_supervisor: DaemonSupervisor | None = None
+
+        # How long each boot stage took, in seconds.
+        self.boot_timings: dict[str, float] = {}
+
         # Define events
-        self.subscribe(hikari.StartingEvent, self._load_command_handler)
+        self.subscribe(hikari.StartingEvent, self._on_starting)
         self.subscribe(hikari.ShardReadyEvent, self._on_ready)
+        self.subscribe(hikari.InteractionCreateEvent, self._on_interaction)
 
         # These events allow the MVC to handle Discord objects.
         self.subscribe(hikari.GuildEvent, DiscordEventHandler.handle_guild_event)
@@ -53,12 +68,43 @@ class Bot(hikari.GatewayBot):
         self.subscribe(hikari.ChannelEvent, DiscordEventHandler.handle_channel_event)
         self.subscribe(hikari.RoleEvent, DiscordEventHandler.handle_role_event)
 
-    async def _load_command_handler(self, _) -> None:
+    async def _load_command_handler(self) -> None:
         """Load Lightbulb."""
         await self.lightbulb.load_extensions("elysia.ext")
 
         await self.lightbulb.start()
         load_injection_for_commands(self.lightbulb)
+
+    @contextlib.contextmanager
+    def _boot_stage(self, name: str) -> t.Iterator[None]:
+        """Time a stage of the boot process, logging and recording how long it took."""
+        start = time.monotonic()
+        yield
+        self.boot_timings[name] = time.monotonic() - start
+        self.logger.info(f"Boot stage '{name}' completed in {round(self.boot_timings[name] * 1000, 2)} ms.")
+
+    async def _on_starting(self, _: hikari.StartingEvent) -> None:
+        """
+        Handle StartingEvent, running every boot stage which doesn't need the gateway.
+
+        None of this waits on a Discord connection, so the web UI and the
+        daemons are up while the gateway is still connecting and the cache
+        is still being filled.
+        """
+        with self._boot_stage("commands"):
+            await self._load_command_handler()
+
+        with self._boot_stage("permissions"):
+            self._permissions_root = Node.build_from_client(self.lightbulb)
+            await self._permissions_root.ensure_objects()
+            await self._permissions_root.delete_unused()
+
+        with self._boot_stage("http"):
+            self._http_daemon = await HTTPDaemon.run(self)
+
+        with self._boot_stage("daemons"):
+            self.logger.info("Starting internal daemons...")
+            self._daemon_supervisor = run_daemons(self)
     
     async def _on_exc_pipeline_error(self, exc: lightbulb.exceptions.ExecutionPipelineFailedException) -> bool:
         """
@@ -71,6 +117,10 @@ class Bot(hikari.GatewayBot):
             return True
         return False
     
+    async def _on_interaction(self, _: hikari.InteractionCreateEvent) -> None:
+        """Draw down the REST budget so background traffic yields to the response."""
+        self.rest_budget.consume(Priority.INTERACTIVE)
+    
     @property
     def http_daemon(self) -> HTTPDaemon:
         if self._http_daemon is None:
@@ -95,31 +145,41 @@ class Bot(hikari.GatewayBot):
         Handle ShardReadyEvent, completing initialization.
 
         Most of the stuff that happens here takes place immediately
-        after forming a Discord API connection.
+        after forming a Discord API connection. Model reconciliation is
+        left to run in the background, once the guild events which follow
+        have had a chance to sync each guild on their own.
         """
         self.last_connection = self.localnow()
-        self._permissions_root = Node.build_from_client(self.lightbulb)
-        await DiscordEventHandler.run_model_update(self)
-        self._http_daemon = await HTTPDaemon.run(self)
+        if "ready" not in self.boot_timings:
+            self.boot_timings["ready"] = time.monotonic() - self._boot_started
 
+        reconciler.request(self)
         self.is_ready.set()
 
         await self._on_reinit()
-        
-        self.logger.info("Starting internal daemons...")
-        run_daemons(self)
-        self.logger.info("Successfully completed boot.")
+        self.logger.info(f"Successfully completed boot in {round(self.boot_timings['ready'], 3)} seconds.")
     
     def print_banner(self, *args, **kwargs):
         """Overload banner with Elysia's logo."""
-        font = "univers"
-        if font not in pyfiglet.Figlet().getFonts():
-            os.system(f"python -m pyfiglet -L {os.path.join(self.conf.asset_dir, 'font/figlet/ANSI\\ Shadow.flf')}")
-        f = pyfiglet.Figlet(font=font)
+        # Listing every installed font just to check for this one doubled
+        # the cost of the banner, so the font is only installed if it's missing.
+        try:
+            f = pyfiglet.Figlet(font="univers")
+        except pyfiglet.FontNotFound:
+            f = self._install_banner_font()
         lolpython.lol_py(f.renderText(self.conf.name))
         lolpython.lol_py(f"{self.conf.version} '{self.conf.version_tag}'")
         print("")
     
+    def _install_banner_font(self) -> pyfiglet.Figlet:
+        """Install the bundled banner font, falling back to pyfiglet's default if that fails."""
+        path = os.path.join(self.conf.asset_dir, "font/figlet/ANSI Shadow.flf")
+        try:
+            pyfiglet.FigletFont.installFonts(path)
+            return pyfiglet.Figlet(font="ANSI Shadow")
+        except (OSError, pyfiglet.FigletError):
+            return pyfiglet.Figlet()
+
     @property
     def timezone(self) -> zoneinfo.ZoneInfo:
         """Timezone of Elysia herself."""
@@ -156,6 +216,14 @@ class Bot(hikari.GatewayBot):
         else:
             self.logger.info("Call to reinitialize made, halting execution.")
 
-        await self.http_daemon.shutdown()
-        self.logger.info(f"{self.conf.name} now shutting down.")
+        start = time.monotonic()
+        if self._daemon_supervisor is not None:
+            elapsed = await self._daemon_supervisor.shutdown(timeout=10.0)
+            self.logger.info(f"Internal daemons drained in {round(elapsed, 3)} seconds.")
+        reconciler.cancel()
+        await ingest_queue.close()
+
+        if self._http_daemon is not None:
+            await self._http_daemon.shutdown()
+        self.logger.info(f"{self.conf.name} now shutting down, pre-close shutdown took {round(time.monotonic() - start, 3)} seconds.")
         await super().close()
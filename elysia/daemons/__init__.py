@@ -2,7 +2,9 @@ import hikari
 
 from ..core.conf import Config
 from ..core.log import logging
+from ..lib.daemon import DaemonSupervisor
 from .advisor import chore_daemon, reminder_daemon
+from .discord import reconcile_daemon
 
 
 conf = Config.load()
@@ -11,17 +13,18 @@ logger = logging.getLogger(conf.name).getChild("daemons")
 
 __all__ = [
     chore_daemon,
-    reminder_daemon
+    reminder_daemon,
+    reconcile_daemon
 ]
 
 
-def run_daemons(bot: hikari.GatewayBot) -> None:
-    loop = hikari.internal.aio.get_or_make_loop()
+def run_daemons(bot: hikari.GatewayBot) -> DaemonSupervisor:
+    supervisor = DaemonSupervisor(bot, logger)
 
     for daemon in __all__:
         daemon = daemon()
         logger.info(f"Starting {daemon.name} daemon")
-        daemon.attach_bot(bot)
-        loop.create_task(daemon.service())
+        supervisor.start(daemon)
+    return supervisor
 
         
\ No newline at end of file
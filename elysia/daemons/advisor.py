@@ -1,13 +1,23 @@
+import asyncio
+from asgiref.sync import sync_to_async
+import datetime
+from django.db.models import Q
 from django.utils import timezone
+import functools
 import hikari
-import oronyx
+import typing as t
 import zoneinfo
 
 
-from ..lib.daemon import daemon
+from ..lib.coalesce import MessageCoalescer
+from ..lib.daemon import daemon, idle, ScheduleMode
+from ..lib.executor import KeyedExecutor
+from ..lib.rest import Priority
+from ..lib.utils import utcnow as get_utcnow
 from ..core.log import logging
 from ..core.conf import Config
-from ..mvc.advisor.models import Notification, Chore, Reminder
+from ..mvc.advisor.models import Notification, Chore, Reminder, ReminderDelivery, NotifySchedule
+from ..mvc.advisor.models.reminders import scheduler as reminder_scheduler
 from ..mvc.discord.models import User
 from ..mvc.threats.models import aget_threat
 
@@ -15,42 +25,195 @@ from ..mvc.threats.models import aget_threat
 conf = Config.load()
 logger = logging.getLogger(conf.name).getChild("daemons")
 
+# Deliveries for the same user stay in order, different users run in parallel.
+chore_executor = KeyedExecutor("chore", logger, concurrency=8)
+reminder_executor = KeyedExecutor("reminder", logger, concurrency=8)
+
+# Chore nudges and reminders due within this many seconds of each other
+# go out to a user as a single message.
+DM_COALESCE_WINDOW: float = 1.0
+dm_coalescer = MessageCoalescer(window=DM_COALESCE_WINDOW)
+
+# How many reminders are claimed into the outbox per transaction, and what
+# happens to occurrences of recurring reminders missed while offline.
+REMINDER_BATCH_SIZE: int = 100
+REMINDER_CATCH_UP: ReminderDelivery.CollapseRule = ReminderDelivery.CollapseRule.LATEST
+# Failed deliveries stay pending, and are retried after this many seconds,
+# up to this many attempts.
+REMINDER_RETRY_DELAY: float = 30.0
+REMINDER_MAX_ATTEMPTS: int = 10
+
+
+_chores_backfilled: bool = False
+
+
+async def notify_chores(bot: hikari.GatewayBot, user: User) -> None:
+    unfinished, _ = await Chore.get_split_chores(user)
+
+    if any(unfinished):
+        threat = await aget_threat()
+        embed = Chore.get_embed(unfinished, threat=threat)
+        await user.aresolve_all(bot)
+        sender = functools.partial(bot.rest_budget.call, Priority.NOTIFICATION, user.obj.send) # type: ignore
+        message = await dm_coalescer.send(user.id, embed, sender)
+        
+        if message.id:
+            await Notification.arecord(user, message.id, unfinished)
+
 
 @daemon("chore", seconds=0.2)
 async def chore_daemon(bot: hikari.GatewayBot) -> None:
+    global _chores_backfilled
+    if not _chores_backfilled:
+        backfilled = await Chore.abackfill()
+        if backfilled:
+            logger.info(f"Backfilled due state for {backfilled} chore(s).")
+        backfilled = await NotifySchedule.abackfill()
+        if backfilled:
+            logger.info(f"Backfilled notify schedules for {backfilled} user(s).")
+        _chores_backfilled = True
+
     now = timezone.localtime()
     now = now.replace(microsecond=0)
 
-    async for user in User.objects.filter(chore_daemon=True):
-        notify_times = user.notify_times.split(",")
+    # Users stay due until they have something to be nagged about, so lag
+    # here is measured from submission rather than from the notify time.
+    # Users with nothing to be nagged about yet aren't picked up at all.
+    due = User.objects.filter(
+        Q(chore__isnull=False, chore__next_due_at__isnull=True) | Q(chore__next_due_at__lte=now),
+        chore_daemon=True,
+        notify_schedules__next_notify_at__lt=now
+    ).distinct()
+    async for user in due:
+        chore_executor.submit(user.id, notify_chores(bot, user))
+
+    # Joining keeps users from being picked up again before last_notify is saved.
+    await chore_executor.join()
+
+
+def is_permanent(error: Exception) -> bool:
+    """Whether a failed delivery would fail the same way every time it was retried."""
+    # Closed DMs, unknown users and the like. hikari retries 429s itself, and
+    # raises RateLimitTooLongError, which isn't a client error, when it won't.
+    return isinstance(error, hikari.ClientHTTPResponseError)
+
+
+async def deliver_reminder(bot: hikari.GatewayBot, delivery: ReminderDelivery) -> bool:
+    """Send a pending delivery, returning False if it failed and should be retried."""
+    reminder = delivery.reminder
+    if reminder is None:
+        await delivery.acancel()
+        return True
+
+    try:
+        await reminder.prefetch()
+        # User.obj raises the NotFoundError of a user which no longer resolves.
+        await reminder.user.aresolve_all(bot)
+        sender = functools.partial(bot.rest_budget.call, Priority.NOTIFICATION, reminder.user.obj.send)
+        message = await dm_coalescer.send(reminder.user_id, reminder.get_embed(), sender)
+    except Exception as e:
+        if not await delivery.afail(permanent=is_permanent(e), max_attempts=REMINDER_MAX_ATTEMPTS):
+            logger.exception(f"Failed to deliver {delivery.key}, it will be retried.")
+            return False
+        logger.warning(f"Giving up on {delivery.key} after {delivery.attempts} attempt(s): {e.__class__.__name__}: {e}")
+    else:
+        await delivery.amark_sent(message.id)
 
-        for time in notify_times:
-            last = user.last_notify.astimezone(timezone.get_current_timezone())
-            future = oronyx.get_future(last, time)
+    # A one-shot reminder is done once its delivery is, whether it was sent or given up on.
+    if reminder.recurring is False:
+        await Reminder.objects.filter(id=reminder.id, recurring=False).adelete()
+    return True
 
-            if future < now:
-                unfinished, _ = await Chore.get_split_chores(user)
 
-                if any(unfinished):
-                    threat = await aget_threat()
-                    embed = Chore.get_embed(unfinished, threat=threat)
-                    await user.aresolve_all(bot)
-                    message = await user.obj.send(embed=embed) # type: ignore
-                    
-                    if message.id:
-                        notification = Notification(user=user, message_id=message.id)
-                        await notification.asave()
-                        for chore in unfinished:
-                            await notification.chores.aadd(chore)
+async def deliver_reminders(bot: hikari.GatewayBot, deliveries: t.List[ReminderDelivery], failed: t.Set[int]) -> None:
+    # These run together so that the coalescer can merge them.
+    results = await asyncio.gather(*[deliver_reminder(bot, delivery) for delivery in deliveries])
+    for delivery, delivered in zip(deliveries, results):
+        if not delivered:
+            failed.add(delivery.id)
 
-                        user.last_notify = notification.timestamp
-                        await user.asave()
 
+async def drain_reminder_outbox(bot: hikari.GatewayBot, utcnow) -> t.Tuple[int, int]:
+    """
+    Claim and deliver due reminders in batches until none are left.
 
-@daemon("reminder", seconds=0.1)
+    Returns the number of reminders claimed and deliveries sent.
+    """
+    claimed_total = 0
+    sent_total = 0
+    failed: t.Set[int] = set()
+
+    while True:
+        claimed = await sync_to_async(ReminderDelivery.claim_due)(
+            utcnow,
+            limit=REMINDER_BATCH_SIZE,
+            collapse=REMINDER_CATCH_UP
+        )
+        for reminder in claimed:
+            if reminder.next_fire_at is None:
+                reminder_scheduler.cancel(reminder.id)
+            else:
+                reminder_scheduler.schedule(reminder.id, reminder.next_fire_at)
+
+        by_user: t.Dict[int, t.List[ReminderDelivery]] = {}
+        async for delivery in ReminderDelivery.get_pending(exclude=failed, limit=REMINDER_BATCH_SIZE):
+            by_user.setdefault(delivery.user_id, []).append(delivery)
+
+        if not claimed and not by_user:
+            break
+
+        for user_id, deliveries in by_user.items():
+            due_at = min([delivery.occurrence for delivery in deliveries])
+            reminder_executor.submit(user_id, deliver_reminders(bot, deliveries, failed), due_at=due_at)
+        await reminder_executor.join()
+
+        claimed_total += len(claimed)
+        sent_total += sum([len(deliveries) for deliveries in by_user.values()])
+
+    if failed:
+        reminder_scheduler.schedule("retry", get_utcnow() + datetime.timedelta(seconds=REMINDER_RETRY_DELAY))
+    return claimed_total, sent_total - len(failed)
+
+
+async def schedule_reminders(queryset) -> None:
+    """(Re)schedule every reminder in the passed queryset."""
+    rows = queryset.filter(next_fire_at__isnull=False).values_list("id", "next_fire_at")
+    async for id, next_fire_at in rows:
+        reminder_scheduler.schedule(id, next_fire_at)
+
+
+# This daemon blocks until a reminder is due, so it shouldn't try to keep a rate.
+@daemon("reminder", seconds=0.1, mode=ScheduleMode.FIXED_DELAY)
 async def reminder_daemon(bot: hikari.GatewayBot) -> None:
+    if not reminder_scheduler.seeded:
+        reminder_scheduler.pop_dirty()
+        backfilled = await Reminder.abackfill()
+        if backfilled:
+            logger.info(f"Backfilled next_fire_at for {backfilled} reminder(s).")
+        pruned = await ReminderDelivery.aprune()
+        if pruned:
+            logger.info(f"Pruned {pruned} old reminder deliveries.")
+        await schedule_reminders(Reminder.objects.all())
+        reminder_scheduler.seeded = True
+        logger.info(f"Scheduled {len(reminder_scheduler)} reminder(s).")
+
+        # Catch up on everything which came due or was left pending while offline.
+        claimed, sent = await drain_reminder_outbox(bot, get_utcnow().replace(microsecond=0))
+        if claimed or sent:
+            logger.info(f"Reminder catch-up claimed {claimed} reminder(s) and sent {sent} delivery(s).")
+
+    await idle(reminder_scheduler.wait())
+
+    changed = reminder_scheduler.pop_dirty()
+    if changed:
+        for id in changed:
+            reminder_scheduler.cancel(id)
+        await schedule_reminders(Reminder.objects.filter(id__in=changed))
+
     utcnow = timezone.localtime().astimezone(zoneinfo.ZoneInfo("UTC"))
     utcnow = utcnow.replace(microsecond=0)
 
-    async for reminder in Reminder.objects.all():
-        await reminder.process(bot, utcnow)
\ No newline at end of file
+    if not reminder_scheduler.pop_due(utcnow):
+        return
+
+    await drain_reminder_outbox(bot, utcnow)
\ No newline at end of file
@@ -0,0 +1,20 @@
+import asyncio
+import hikari
+
+from ..lib.daemon import daemon
+from ..mvc.discord.hooks import reconciler
+
+
+# Guild events keep the models in sync, so a full pass is only a safety net.
+RECONCILE_INTERVAL: float = 6 * 3600
+
+
+@daemon("reconcile", hours=1)
+async def reconcile_daemon(bot: hikari.GatewayBot) -> None:
+    # The first run is requested once the gateway is ready and the cache is filled.
+    if not bot.is_ready.is_set() or reconciler.running:
+        return
+
+    now = asyncio.get_running_loop().time()
+    if reconciler.last_completed is None or now - reconciler.last_completed >= RECONCILE_INTERVAL:
+        reconciler.request(bot)
@@ -9,6 +9,11 @@ from ...core.conf import Config
 from ...lib.utils import strfdelta, get_byte_unit, get_dir_size, aio_get
 from ...lib.components import validate, pagify
 from ...lib.ctx import DelayedResponse
+from ...lib.daemon import Daemon
+from ...lib.executor import KeyedExecutor
+from ...daemons.advisor import dm_coalescer
+from ...mvc.discord.fields.cache import resolution_cache, role_index
+from ...mvc.discord.ingest import ingest_queue
 
 
 conf = Config.load()
@@ -133,4 +138,73 @@ class IP(
             ip = await aio_get("https://api.ipify.org")
             embed = hikari.Embed(title="TCP/IP Information")
             embed.add_field("IP Address", ip)
-            return await response.complete("", embed=embed)
\ No newline at end of file
+            return await response.complete("", embed=embed)
+
+
+@bot.register
+class Daemons(
+    lightbulb.SlashCommand,
+    name="daemons",
+    description=f"View the status of {conf.name}'s internal daemons."
+):
+    @lightbulb.invoke
+    async def invoke(self, ctx: lightbulb.Context) -> None:
+        if not Daemon.RUNNING:
+            return await ctx.respond("No daemons are running.")
+
+        embed = hikari.Embed(title=f"{conf.name}'s Daemons")
+        for name, daemon in sorted(Daemon.RUNNING.items()):
+            metrics = daemon.metrics
+            last_duration = "N/A" if metrics.last_duration is None else f"{round(metrics.last_duration * 1000, 2)} ms"
+            last_success = "Never" if metrics.last_success is None else metrics.last_success.strftime('%x %X %Z')
+            last_failure = "Never" if metrics.last_failure is None else metrics.last_failure.strftime('%x %X %Z')
+
+            info = f"Mode: {daemon.mode.value}, every {daemon.seconds}s\n"
+            info += f"Runs: {metrics.runs} | Errors: {metrics.errors} | Restarts: {metrics.restarts}\n"
+            info += f"Overruns: {metrics.overruns} | Skipped: {metrics.skipped}\n"
+            info += f"Last Run: {last_duration}\n"
+            info += f"Last Success: {last_success}\n"
+            info += f"Last Failure: {last_failure}"
+            if metrics.last_error is not None:
+                info += f"\n```{metrics.last_error[:256]}```"
+
+            histogram = "\n".join([f"{label}: {count}" for label, count in metrics.buckets.items() if count])
+            if histogram:
+                info += f"\n```{histogram}```"
+            embed.add_field(name.capitalize(), value=info)
+
+        for name, executor in sorted(KeyedExecutor.ALL.items()):
+            metrics = executor.metrics
+            p50, p95 = metrics.percentile(50), metrics.percentile(95)
+            lag = "N/A" if p50 is None else f"p50 {round(p50, 3)}s, p95 {round(p95, 3)}s"
+
+            info = f"Queue Depth: {executor.depth} (max {metrics.max_depth})\n"
+            info += f"Completed: {metrics.completed} | Failed: {metrics.failed}\n"
+            info += f"Delivery Lag: {lag}"
+            embed.add_field(f"{name.capitalize()} Deliveries", value=info)
+
+        coalescer = dm_coalescer
+        embed.add_field("DM Coalescing", value=f"{coalescer.embeds_sent} embed(s) sent in {coalescer.messages_sent} message(s)")
+
+        budget = ctx.client.app.rest_budget
+        rest = f"Tokens: {round(budget.tokens, 1)}/{budget.capacity}\n"
+        for priority, counters in sorted(budget.counters.items()):
+            rest += f"{priority.name.capitalize()}: {counters['requests']} sent, {counters['deferred']} deferred, {counters['throttled']} throttled\n"
+        embed.add_field("REST Budget", value=rest)
+
+        stats = resolution_cache.stats
+        resolution = f"Entries: {len(resolution_cache)} | Hit Ratio: {round(stats.ratio * 100, 1)}%\n"
+        resolution += f"Hits: {stats.hits} | Negative Hits: {stats.negative_hits} | Misses: {stats.misses}\n"
+        resolution += f"REST Fallbacks: {stats.rest_calls} | Coalesced: {stats.coalesced} | Invalidations: {stats.invalidations}"
+        resolution += f"\nRole Index: {len(role_index)} guild(s), {role_index.fetches} fetch(es), {role_index.stats.hits} hit(s)"
+        embed.add_field("ID Resolution Cache", value=resolution)
+
+        metrics = ingest_queue.metrics
+        p50, p95 = metrics.percentile(50), metrics.percentile(95)
+        latency = "N/A" if p50 is None else f"p50 {round(p50 * 1000, 1)} ms, p95 {round(p95 * 1000, 1)} ms"
+        ingestion = f"Queue Depth: {ingest_queue.depth} (max {metrics.max_depth})\n"
+        ingestion += f"Queued: {metrics.enqueued} | Coalesced: {metrics.coalesced} | Written: {metrics.written}\n"
+        ingestion += f"Flushes: {metrics.flushes} | Failed: {metrics.failed}\n"
+        ingestion += f"Flush Latency: {latency}"
+        embed.add_field("Gateway Ingestion", value=ingestion)
+        await ctx.respond(embed)
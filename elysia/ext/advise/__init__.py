@@ -1,7 +1,7 @@
 import lightbulb
-import oronyx
 
 from ...core.conf import Config
+from ...lib.rules import compile_rule
 from ...mvc.discord.models import User
 from ...mvc.advisor.models import Reminder
 
@@ -35,7 +35,7 @@ class RemindCommand(
     
     @lightbulb.invoke
     async def invoke(self, ctx: lightbulb.Context, user: User):
-        scheduler = oronyx.get_scheduler(self.time)
+        scheduler = compile_rule(self.time)
         if scheduler is None:
             out = f"Invalid time string: `{self.time}`."
             out += f"\nTo view examples of valid time strings, visit https://{conf.mvc.allowed_hosts[0]}/oronyx."
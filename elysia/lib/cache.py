@@ -0,0 +1,91 @@
+"""Module defining in-memory caches
+
+Several of Elysia's hot paths compute the same things over and over. The
+caches in here are small, process-wide, and size-bounded so that they can
+be shared safely between the daemons and the MVC.
+
+    * CacheStats - Dataclass holding the hit and miss counters of a cache
+    * LRUCache - Class implementing a size-bounded least-recently-used cache
+"""
+import collections
+import dataclasses
+import threading
+import typing as t
+
+
+MISSING = object()
+
+
+@dataclasses.dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache:
+    """
+    Size-bounded least-recently-used cache.
+
+    Access is guarded by a lock, since the MVC calls into these caches from
+    sync_to_async worker threads as well as from the event loop.
+
+    Args:
+        maxsize (int): The most entries the cache will hold before it
+            starts evicting the least recently used ones.
+    """
+    def __init__(self, maxsize: int=1024) -> None:
+        if maxsize <= 0:
+            raise ValueError("The size of a cache must be greater than 0.")
+
+        self.maxsize: int = maxsize
+        self.stats: CacheStats = CacheStats()
+        self._data: collections.OrderedDict = collections.OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: t.Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: t.Hashable, default: t.Any=MISSING) -> t.Any:
+        """Return the cached value of `key`, or `default` if it is not cached."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.stats.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: t.Hashable, value: t.Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def get_or_compute(self, key: t.Hashable, compute: t.Callable[[], t.Any]) -> t.Any:
+        """Return the cached value of `key`, computing and caching it on a miss."""
+        value = self.get(key)
+        if value is MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: t.Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
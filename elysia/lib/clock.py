@@ -0,0 +1,61 @@
+"""Module defining the virtual clock
+
+Elysia's daemons are driven by the time of day, which makes them painful
+to observe at scale: waiting three days to see what happens after three
+days is not an option. The clock in here lets a simulation take over
+"now", for Elysia's own code and for Django's, and move it forward at will.
+
+    * VirtualClock - Class implementing a manually advanced clock which can be installed in place of the real one
+"""
+from __future__ import annotations
+import datetime
+from django.utils import timezone
+
+from . import utils
+
+
+class VirtualClock:
+    """
+    Manually advanced clock.
+
+    While installed, `lib.utils.utcnow()` and `django.utils.timezone.now()`
+    (and with it `timezone.localtime()` and `auto_now_add` fields) all
+    return the clock's time instead of the real one.
+
+    Args:
+        start (datetime.datetime): The time the clock starts at. Defaults
+            to the real current time.
+    """
+    def __init__(self, start: datetime.datetime | None=None) -> None:
+        self._now: datetime.datetime = start or datetime.datetime.now(datetime.UTC)
+        self._original_now = None
+
+    def now(self) -> datetime.datetime:
+        return self._now
+
+    def advance(self, delta: datetime.timedelta) -> datetime.datetime:
+        if delta < datetime.timedelta(0):
+            raise ValueError("The clock cannot be moved backwards.")
+        self._now += delta
+        return self._now
+
+    def install(self) -> VirtualClock:
+        if self._original_now is not None:
+            raise RuntimeError("This clock is already installed.")
+        self._original_now = timezone.now
+        timezone.now = self.now
+        utils._clock_override = self.now
+        return self
+
+    def uninstall(self) -> None:
+        if self._original_now is None:
+            return
+        timezone.now = self._original_now
+        utils._clock_override = None
+        self._original_now = None
+
+    def __enter__(self) -> VirtualClock:
+        return self.install()
+
+    def __exit__(self, *_) -> None:
+        self.uninstall()
@@ -0,0 +1,103 @@
+"""Module defining the message coalescer
+
+When several things want to DM the same user at around the same time, like
+a handful of reminders and a chore nudge, sending each of them separately
+costs a REST call and rate limit budget apiece. The coalescer holds embeds
+for a short window and sends everything bound for the same destination as
+one message.
+
+    * MessageCoalescer - Class buffering embeds per destination and sending them together
+"""
+from __future__ import annotations
+import asyncio
+import dataclasses
+import hikari
+import typing as t
+
+
+Sender = t.Callable[..., t.Awaitable[hikari.Message]]
+
+
+@dataclasses.dataclass
+class _Batch:
+    sender: Sender
+    timer: t.Optional[asyncio.TimerHandle] = None
+    items: t.List[t.Tuple[hikari.Embed, asyncio.Future]] = dataclasses.field(default_factory=list)
+
+    @property
+    def length(self) -> int:
+        return sum([embed.total_length() for embed, _ in self.items])
+
+
+class MessageCoalescer:
+    """
+    Per-destination buffer merging embeds into as few messages as possible.
+
+    Args:
+        window (float): How long in seconds the first embed bound for a
+            destination waits for others to join it.
+    """
+    # Discord's limits on a single message.
+    MAX_EMBEDS: int = 10
+    MAX_LENGTH: int = 6000
+
+    def __init__(self, window: float=1.0) -> None:
+        self.window: float = window
+        self.messages_sent: int = 0
+        self.embeds_sent: int = 0
+        self._batches: t.Dict[t.Hashable, _Batch] = {}
+        # The event loop only keeps weak references to tasks.
+        self._deliveries: t.Set[asyncio.Task] = set()
+
+    async def send(self, key: t.Hashable, embed: hikari.Embed, sender: Sender) -> hikari.Message:
+        """
+        Queue an embed for the destination identified by `key`.
+
+        `sender` is called with an `embeds` kwarg when the batch is flushed,
+        and only the sender of the first embed in a batch is used. Every
+        caller whose embed ended up in the batch gets the same message back,
+        so they can each record their own bookkeeping against it.
+        """
+        loop = asyncio.get_running_loop()
+
+        batch = self._batches.get(key)
+        if batch is not None and batch.length + embed.total_length() > self.MAX_LENGTH:
+            self._flush(key)
+            batch = None
+
+        if batch is None:
+            batch = _Batch(sender)
+            batch.timer = loop.call_later(self.window, self._flush, key)
+            self._batches[key] = batch
+
+        future = loop.create_future()
+        batch.items.append((embed, future))
+        if len(batch.items) >= self.MAX_EMBEDS:
+            self._flush(key)
+
+        return await future
+
+    def _flush(self, key: t.Hashable) -> None:
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return
+
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._deliver(batch))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, batch: _Batch) -> None:
+        try:
+            message = await batch.sender(embeds=[embed for embed, _ in batch.items])
+        except Exception as e:
+            for _, future in batch.items:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            self.messages_sent += 1
+            self.embeds_sent += len(batch.items)
+            for _, future in batch.items:
+                if not future.done():
+                    future.set_result(message)
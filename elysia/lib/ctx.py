@@ -25,7 +25,6 @@ import io
 import lightbulb
 import miru
 import re
-import plotly.figure_factory as figure_factory
 import typing as t
 
 from .utils import utcnow
@@ -285,6 +284,9 @@ def contains_mention_of(text: str, user: hikari.User) -> bool:
 
 class ImageTable:
     def __init__(self, rows: t.Optional[t.List[str]]=[]) -> None:
+        # Plotly takes longer to import than the rest of the bot put together.
+        import plotly.figure_factory as figure_factory
+
         self.rows = rows
         self.plot = figure_factory.create_table(self.rows)
         self.io = io.BytesIO()
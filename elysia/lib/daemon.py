@@ -5,24 +5,95 @@ that follows defines the behavior of them, as well as interfaces
 for Elysia to interact with them, and shut them down when need be.
 Most daemons are defined within core.bot.
 
+    * ScheduleMode - Enum defining whether a daemon runs at a fixed rate, or with a fixed delay between runs
+    * DaemonMetrics - Dataclass recording run durations, overruns, and successes and failures of a daemon
     * Daemon - Class abstracting a daemon
+    * idle - Coroutine which awaits something on behalf of the current daemon, returning early if it is stopped
+    * DaemonSupervisor - Class owning the tasks of running daemons, restarting them on failure and draining them on shutdown
     * daemon - Decorator which turns a function into a daemon with the specific execution period
 """
 
 import asyncio
+import bisect
+import contextvars
+import dataclasses
+import datetime
+import enum
 import hikari
-import traceback
+import logging
+import math
 import typing as t
 
+from .utils import utcnow
+
+
+class ScheduleMode(enum.Enum):
+    # Ticks are scheduled against a monotonic clock, so the period doesn't drift.
+    FIXED_RATE = "fixed_rate"
+    # The daemon sleeps for its period after each run, however long the run took.
+    FIXED_DELAY = "fixed_delay"
+
+
+@dataclasses.dataclass
+class DaemonMetrics:
+    # Upper bounds, in seconds, of the run duration histogram buckets.
+    BUCKETS: t.ClassVar[t.Tuple[float, ...]] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, math.inf)
+
+    runs: int = 0
+    errors: int = 0
+    restarts: int = 0
+    overruns: int = 0
+    skipped: int = 0
+    last_duration: t.Optional[float] = None
+    last_success: t.Optional[datetime.datetime] = None
+    last_failure: t.Optional[datetime.datetime] = None
+    last_error: t.Optional[str] = None
+    histogram: t.List[int] = dataclasses.field(default_factory=lambda: [0] * len(DaemonMetrics.BUCKETS))
+
+    def record(self, duration: float, error: t.Optional[BaseException]=None) -> None:
+        self.runs += 1
+        self.last_duration = duration
+        self.histogram[bisect.bisect_left(self.BUCKETS, duration)] += 1
+
+        if error is None:
+            self.last_success = utcnow()
+        else:
+            self.errors += 1
+            self.last_failure = utcnow()
+            self.last_error = f"{error.__class__.__name__}: {error}"
+
+    @property
+    def buckets(self) -> t.Dict[str, int]:
+        """The run duration histogram, keyed by a label for each bucket."""
+        labels = [f"<={bound}s" if bound != math.inf else f">{self.BUCKETS[-2]}s" for bound in self.BUCKETS]
+        return dict(zip(labels, self.histogram))
+
+    def as_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            'runs': self.runs,
+            'errors': self.errors,
+            'restarts': self.restarts,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'last_duration': self.last_duration,
+            'last_success': self.last_success,
+            'last_failure': self.last_failure,
+            'last_error': self.last_error,
+            'histogram': self.buckets,
+        }
+
 
 class Daemon:
     ALL = []
+    RUNNING: t.Dict[str, "Daemon"] = {}
 
     def __init__(self,
         name: str,
         callback: t.Coroutine,
         seconds: float,
         *args: t.Any,
+        mode: ScheduleMode=ScheduleMode.FIXED_RATE,
+        skip_missed: bool=True,
         **kwargs: t.Any
     ):
         self.name = name
@@ -30,40 +101,222 @@ class Daemon:
         self.args = args
         self.kwargs = kwargs
         self.seconds: float = seconds
+        self.mode: ScheduleMode = mode
+        self.skip_missed: bool = skip_missed
+        self.metrics: DaemonMetrics = DaemonMetrics()
         self._bot: t.Optional[hikari.GatewayBot] = None
-    
+        self._stopping: asyncio.Event = asyncio.Event()
+        # Seconds the current run has spent in idle(), left out of its duration.
+        self._idled: float = 0.0
+
     def attach_bot(self, bot: hikari.GatewayBot) -> None:
         self._bot = bot
 
     @property
     def callback(self) -> t.Coroutine:
         async def inner(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            self._idled = 0.0
+            start = loop.time()
             try:
-                return await self._callback(*args, **kwargs)
+                result = await self._callback(*args, **kwargs)
             except Exception as e:
-                traceback.print_exc()
+                # The supervisor logs the failure and restarts the daemon with backoff.
+                self.metrics.record(loop.time() - start - self._idled, error=e)
+                raise
+            else:
+                self.metrics.record(loop.time() - start - self._idled)
+                return result
         return inner
-        
+
     @property
     def bot(self) -> hikari.GatewayBot:
         if not self._bot:
             raise ValueError("Bot not attached.")
         return self._bot
-    
+
+    def get_metrics(self) -> t.Dict[str, t.Any]:
+        return self.metrics.as_dict()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping.is_set()
+
+    def stop(self) -> None:
+        """Ask the daemon to stop once its current run is complete."""
+        self._stopping.set()
+
+    async def sleep(self, seconds: float) -> None:
+        """Sleep for the passed number of seconds, waking early if the daemon is stopped."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def _get_delay(self, next_tick: float, now: float, duration: float) -> t.Tuple[float, float]:
+        """
+        Work out how long to sleep before the next run.
+
+        Returns the delay, along with the monotonic time the next tick was
+        scheduled for, which only matters in fixed rate mode.
+        """
+        if self.mode is ScheduleMode.FIXED_DELAY:
+            return self.seconds, now + self.seconds
+
+        if duration > self.seconds:
+            self.metrics.overruns += 1
+
+        next_tick += self.seconds
+        if now > next_tick and self.skip_missed:
+            missed = math.ceil((now - next_tick) / self.seconds)
+            self.metrics.skipped += missed
+            next_tick += missed * self.seconds
+        return max(0.0, next_tick - now), next_tick
+
     async def service(self) -> None:
-        while True:
+        Daemon.RUNNING[self.name] = self
+        _current.set(self)
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+
+        while not self.stopping:
             await self.callback(self.bot, *self.args, **self.kwargs)
-            await asyncio.sleep(self.seconds)
+            now = loop.time()
 
+            # Overruns are judged on the time spent working, not idling.
+            delay, next_tick = self._get_delay(next_tick, now, self.metrics.last_duration)
+            await self.sleep(delay)
 
-def daemon(name, seconds: float=0, minutes: float=0, hours: float=0, days: float=0) -> t.Callable:
+
+_current: contextvars.ContextVar[Daemon] = contextvars.ContextVar("daemon")
+
+
+async def idle(awaitable: t.Awaitable) -> None:
+    """
+    Await something on behalf of the daemon this is called from.
+
+    This is meant for daemons which block until there is work to do. The
+    awaitable is abandoned as soon as the daemon is asked to stop, so the
+    supervisor doesn't have to wait out its deadline for a daemon that was
+    never doing anything in the first place. Time spent in here doesn't
+    count towards the duration of the daemon's run.
+    """
+    daemon = _current.get(None)
+    if daemon is None:
+        await awaitable
+        return
+
+    if daemon.stopping:
+        return
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    work = loop.create_task(awaitable)
+    stop = loop.create_task(daemon._stopping.wait())
+    try:
+        await asyncio.wait([work, stop], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        daemon._idled += loop.time() - start
+
+    for task in (work, stop):
+        if not task.done():
+            task.cancel()
+    await asyncio.gather(work, stop, return_exceptions=True)
+
+
+class DaemonSupervisor:
+    """
+    Owner of the tasks of every running daemon.
+
+    Args:
+        bot (hikari.GatewayBot): The bot attached to supervised daemons.
+        logger (logging.Logger): Where restarts and shutdown timings go.
+        initial_backoff (float): The delay in seconds before the first
+            restart of a failed daemon. It doubles with each consecutive
+            failure, up to `max_backoff`, and is reset by any successful run.
+        max_backoff (float): The longest delay in seconds between restarts.
+    """
+    def __init__(
+            self,
+            bot: hikari.GatewayBot,
+            logger: logging.Logger,
+            initial_backoff: float=1.0,
+            max_backoff: float=300.0
+        ) -> None:
+        self.bot: hikari.GatewayBot = bot
+        self.logger: logging.Logger = logger
+        self.initial_backoff: float = initial_backoff
+        self.max_backoff: float = max_backoff
+        self.daemons: t.List[Daemon] = []
+        self._tasks: t.Dict[str, asyncio.Task] = {}
+
+    def start(self, daemon: Daemon) -> asyncio.Task:
+        daemon.attach_bot(self.bot)
+        loop = hikari.internal.aio.get_or_make_loop()
+        task = loop.create_task(self._supervise(daemon), name=f"daemon:{daemon.name}")
+        self.daemons.append(daemon)
+        self._tasks[daemon.name] = task
+        return task
+
+    async def _supervise(self, daemon: Daemon) -> None:
+        backoff = self.initial_backoff
+
+        while not daemon.stopping:
+            succeeded = daemon.metrics.runs - daemon.metrics.errors
+            try:
+                await daemon.service()
+            except Exception:
+                # Any successful run since the last restart means this failure
+                # is a new one, so a transient error only costs the initial backoff.
+                if daemon.metrics.runs - daemon.metrics.errors > succeeded:
+                    backoff = self.initial_backoff
+
+                daemon.metrics.restarts += 1
+                self.logger.exception(f"The {daemon.name} daemon failed, restarting in {backoff} seconds.")
+                await daemon.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    async def shutdown(self, timeout: float=10.0) -> float:
+        """
+        Stop every daemon, letting in-flight runs finish within the timeout.
+
+        Daemons still running once the timeout passes are cancelled. Returns
+        the number of seconds the whole thing took.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        for daemon in self.daemons:
+            daemon.stop()
+
+        tasks = list(self._tasks.values())
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                self.logger.warning(f"{task.get_name()} did not drain within {timeout} seconds, cancelling it.")
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._tasks.clear()
+        return loop.time() - start
+
+
+def daemon(
+        name,
+        seconds: float=0,
+        minutes: float=0,
+        hours: float=0,
+        days: float=0,
+        mode: ScheduleMode=ScheduleMode.FIXED_RATE,
+        skip_missed: bool=True
+    ) -> t.Callable:
     seconds = seconds + (minutes * 60) + (hours * 3600) + (days * 86400)
     if seconds <= 0:
         raise ValueError("The total time for a daemon's execution cannot be 0.")
-    
+
     def inner(func) -> t.Callable:
         def inner_inner(*args, **kwargs) -> Daemon:
-            return Daemon(name, func, seconds, *args, **kwargs)
+            return Daemon(name, func, seconds, *args, mode=mode, skip_missed=skip_missed, **kwargs)
         Daemon.ALL.append(inner_inner)
         return inner_inner
-    return inner
\ No newline at end of file
+    return inner
@@ -0,0 +1,145 @@
+"""Module defining the keyed executor
+
+Daemons often have a batch of independent pieces of work to do at once,
+like delivering every reminder which came due in the same second. Doing
+them one after the other makes the last one wait on every REST call before
+it, but doing them all at once with no limit can flood the REST client.
+The executor in here sits in the middle.
+
+    * ExecutorMetrics - Dataclass recording the queue depth and delivery lag of an executor
+    * KeyedExecutor - Class running work concurrently across keys, but in order within each key
+"""
+import asyncio
+import collections
+import dataclasses
+import datetime
+import logging
+import typing as t
+
+from .stats import percentile
+from .utils import utcnow
+
+
+@dataclasses.dataclass
+class ExecutorMetrics:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    max_depth: int = 0
+    # The most recent delivery lags, in seconds.
+    lags: t.Deque[float] = dataclasses.field(default_factory=lambda: collections.deque(maxlen=1024))
+
+    def percentile(self, percent: float) -> t.Optional[float]:
+        """Return the passed percentile of the recent delivery lags."""
+        return percentile(self.lags, percent)
+
+    def as_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'max_depth': self.max_depth,
+            'lag_p50': self.percentile(50),
+            'lag_p95': self.percentile(95),
+            'lag_max': max(self.lags) if self.lags else None,
+        }
+
+
+class KeyedExecutor:
+    """
+    Bounded-concurrency executor which keeps work for the same key in order.
+
+    Every key gets its own FIFO queue, drained by its own worker task, and a
+    shared semaphore bounds how many pieces of work run at once across all
+    keys. Keying by user means one user's deliveries never overtake each
+    other, while different users' deliveries run in parallel.
+
+    Args:
+        name (str): The name this executor is reported under.
+        concurrency (int): The most pieces of work which may run at once.
+        logger (logging.Logger): Where failures are logged.
+    """
+    ALL: t.Dict[str, "KeyedExecutor"] = {}
+
+    def __init__(self, name: str, logger: logging.Logger, concurrency: int=8) -> None:
+        if concurrency <= 0:
+            raise ValueError("The concurrency of an executor must be greater than 0.")
+
+        self.name: str = name
+        self.logger: logging.Logger = logger
+        self.concurrency: int = concurrency
+        self.metrics: ExecutorMetrics = ExecutorMetrics()
+
+        self._semaphore: t.Optional[asyncio.Semaphore] = None
+        self._queues: t.Dict[t.Hashable, t.Deque] = {}
+        self._workers: t.Dict[t.Hashable, asyncio.Task] = {}
+        self._running: int = 0
+        KeyedExecutor.ALL[name] = self
+
+    @property
+    def depth(self) -> int:
+        """The number of pieces of work queued or running."""
+        return sum([len(queue) for queue in self._queues.values()]) + self._running
+
+    def submit(
+            self,
+            key: t.Hashable,
+            work: t.Coroutine,
+            due_at: t.Optional[datetime.datetime]=None
+        ) -> None:
+        """
+        Queue a coroutine to run after any other work with the same key.
+
+        If `due_at` is passed, the delivery lag is measured from then, rather
+        than from the time the work was submitted.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        queue = self._queues.setdefault(key, collections.deque())
+        queue.append((work, due_at or utcnow()))
+        self.metrics.submitted += 1
+        self.metrics.max_depth = max(self.metrics.max_depth, self.depth)
+
+        if key not in self._workers:
+            loop = asyncio.get_running_loop()
+            self._workers[key] = loop.create_task(self._drain(key))
+
+    async def _drain(self, key: t.Hashable) -> None:
+        queue = self._queues[key]
+        try:
+            while queue:
+                work, due_at = queue.popleft()
+                self._running += 1
+                try:
+                    async with self._semaphore:
+                        await work
+                except Exception:
+                    self.metrics.failed += 1
+                    self.logger.exception(f"Work for {key} failed in the {self.name} executor.")
+                else:
+                    self.metrics.completed += 1
+                finally:
+                    self._running -= 1
+                    self.metrics.lags.append((utcnow() - due_at).total_seconds())
+        finally:
+            for work, _ in queue:
+                work.close()
+            del self._queues[key]
+            del self._workers[key]
+
+    async def join(self) -> None:
+        """
+        Wait until every piece of submitted work is done.
+
+        If this is cancelled, for example because the daemon using it is
+        being shut down past its deadline, the outstanding work is cancelled
+        along with it.
+        """
+        try:
+            while self._workers:
+                await asyncio.gather(*list(self._workers.values()), return_exceptions=True)
+        except asyncio.CancelledError:
+            for worker in list(self._workers.values()):
+                worker.cancel()
+            raise
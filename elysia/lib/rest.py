@@ -0,0 +1,101 @@
+"""Module defining the REST budget
+
+Background DMs, maintenance lookups and interactive command responses all
+share hikari's REST client, and with it, Discord's rate limits. Hikari will
+happily queue background traffic ahead of a command response, so the
+budget in here decides who goes first before a request ever reaches it.
+
+    * Priority - Enum defining the priority classes of outbound REST traffic
+    * RESTBudget - Class implementing a token bucket which holds back capacity for higher priority traffic
+"""
+import asyncio
+import collections
+import enum
+import typing as t
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0
+    NOTIFICATION = 1
+    MAINTENANCE = 2
+
+
+class RESTBudget:
+    """
+    Token bucket shared by all outbound REST traffic.
+
+    Lower priority requests may only take a token while the bucket holds
+    more than their reserve, so there is always capacity left over for
+    whatever outranks them. Interactive traffic never waits, it just draws
+    the bucket down, which is what pushes background traffic back.
+
+    Args:
+        rate (float): The number of tokens added to the bucket per second.
+        capacity (float): The most tokens the bucket can hold.
+    """
+    # The fraction of the bucket each priority class has to leave alone.
+    RESERVE: t.Dict[Priority, float] = {
+        Priority.INTERACTIVE: 0.0,
+        Priority.NOTIFICATION: 0.2,
+        Priority.MAINTENANCE: 0.5,
+    }
+
+    def __init__(self, rate: float=50.0, capacity: float=50.0) -> None:
+        self.rate: float = rate
+        self.capacity: float = capacity
+        self._tokens: float = capacity
+        self._updated: t.Optional[float] = None
+        self.counters: t.Dict[Priority, t.Dict[str, int]] = collections.defaultdict(
+            lambda: {'requests': 0, 'deferred': 0, 'throttled': 0}
+        )
+
+    def _refill(self) -> None:
+        now = asyncio.get_running_loop().time()
+        if self._updated is not None:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def consume(self, priority: Priority=Priority.INTERACTIVE) -> None:
+        """Take a token without waiting, even if that overdraws the bucket."""
+        self._refill()
+        self._tokens -= 1
+        self.counters[priority]['requests'] += 1
+        if self._tokens < 0:
+            self.counters[priority]['throttled'] += 1
+
+    async def acquire(self, priority: Priority) -> None:
+        """
+        Wait until a request of the passed priority may go out.
+
+        A request which had to wait for capacity held back for higher
+        priorities counts as deferred, and one which had to wait because
+        the bucket was empty counts as throttled.
+        """
+        if priority is Priority.INTERACTIVE:
+            return self.consume(priority)
+
+        self.counters[priority]['requests'] += 1
+        floor = self.capacity * self.RESERVE[priority]
+        counted = False
+
+        while True:
+            self._refill()
+            if self._tokens - 1 >= floor:
+                self._tokens -= 1
+                return
+
+            if not counted:
+                reason = "throttled" if self._tokens < 1 else "deferred"
+                self.counters[priority][reason] += 1
+                counted = True
+            await asyncio.sleep((floor + 1 - self._tokens) / self.rate)
+
+    async def call(self, priority: Priority, func: t.Callable[..., t.Awaitable], *args, **kwargs) -> t.Any:
+        """Acquire a token for the passed priority, then await `func`."""
+        await self.acquire(priority)
+        return await func(*args, **kwargs)
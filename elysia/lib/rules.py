@@ -0,0 +1,58 @@
+"""Module defining the compiled oronyx rule cache
+
+Chore frequencies, reminder rules and user notify times are all oronyx
+rule strings, and the same handful of them get evaluated over and over by
+the daemons, the models and the MVC. Parsing a natural language rule isn't
+free, so everything in here is memoized in size-bounded LRU caches.
+Rules typed into the web UI get a small cache of their own, so that every
+keystroke doesn't evict a rule the daemons evaluate on every tick.
+
+    * compile_rule - Function returning the (cached) oronyx scheduler for a rule, or None if it is invalid
+    * next_occurrence - Function returning the (cached) next occurrence of a rule after a given time
+    * get_stats - Function returning the hit and miss counters of every cache
+"""
+import datetime
+import oronyx
+import typing as t
+
+from .cache import LRUCache, CacheStats
+
+
+_schedulers: LRUCache = LRUCache(maxsize=512)
+_interactive: LRUCache = LRUCache(maxsize=64)
+_occurrences: LRUCache = LRUCache(maxsize=8192)
+
+
+def compile_rule(rule: str, interactive: bool=False) -> t.Optional[t.Any]:
+    """
+    Return the oronyx scheduler for the passed rule.
+
+    Invalid rules are cached too, as None, so repeatedly evaluating a
+    partially typed rule stays cheap. Pass `interactive` for rules which
+    are still being typed, to keep them out of the cache the daemons use.
+    """
+    cache = _interactive if interactive else _schedulers
+    return cache.get_or_compute(rule, lambda: oronyx.get_scheduler(rule))
+
+
+def next_occurrence(rule: str, after: datetime.datetime) -> datetime.datetime:
+    """
+    Return the next occurrence of the passed rule after the passed time.
+
+    Results are keyed by the rule and the reference time, including its
+    timezone, since that's what the result is expressed in. Those only
+    change when something is accomplished or delivered, so the daemons hit
+    this cache on nearly every tick.
+    """
+    key = (rule, after, str(after.tzinfo))
+    # oronyx only evaluates rules through get_future(), which parses the rule
+    # again, so it's the result that's memoized here rather than the parse.
+    return _occurrences.get_or_compute(key, lambda: oronyx.get_future(after, rule))
+
+
+def get_stats() -> t.Dict[str, CacheStats]:
+    return {
+        'schedulers': _schedulers.stats,
+        'interactive': _interactive.stats,
+        'occurrences': _occurrences.stats,
+    }
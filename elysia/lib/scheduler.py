@@ -0,0 +1,133 @@
+"""Module defining the deadline scheduler
+
+Some daemons don't need to run on a fixed period, they need to run when
+something is due. Rather than polling the database over and over, those
+daemons keep a min-heap of deadlines and sleep until the earliest one, or
+until something else tells them that the schedule has changed.
+
+    * DeadlineScheduler - Class implementing a min-heap of deadlines which can be woken by change notifications
+"""
+import asyncio
+import datetime
+import heapq
+import itertools
+import threading
+import typing as t
+
+from .utils import utcnow
+
+
+class DeadlineScheduler:
+    """
+    Min-heap of deadlines keyed by some hashable identifier.
+
+    Entries are never removed from the heap directly. Rescheduling or
+    cancelling a key just replaces or removes its entry in the lookup table,
+    and stale heap items are discarded lazily when they reach the top.
+
+    Args:
+        max_sleep (float): The longest time in seconds `wait()` will sleep
+            without waking up, even if nothing is due. This only exists to
+            guard against wall clock jumps.
+    """
+    def __init__(self, max_sleep: float=60.0) -> None:
+        self.max_sleep: float = max_sleep
+        self._heap: t.List[t.Tuple[datetime.datetime, int, t.Hashable]] = []
+        self._deadlines: t.Dict[t.Hashable, t.Tuple[datetime.datetime, int]] = {}
+        self._counter = itertools.count()
+
+        self._dirty: t.Set[t.Hashable] = set()
+        self._lock: threading.Lock = threading.Lock()
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._loop: t.Optional[asyncio.AbstractEventLoop] = None
+        self.seeded: bool = False
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: t.Hashable) -> bool:
+        return key in self._deadlines
+
+    def schedule(self, key: t.Hashable, when: datetime.datetime) -> None:
+        """Set (or replace) the deadline of the passed key."""
+        entry = (when, next(self._counter))
+        self._deadlines[key] = entry
+        heapq.heappush(self._heap, (*entry, key))
+
+    def cancel(self, key: t.Hashable) -> None:
+        """Remove the deadline of the passed key, if it has one."""
+        self._deadlines.pop(key, None)
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._deadlines.clear()
+        self.seeded = False
+
+    def _discard_stale(self) -> None:
+        while self._heap:
+            when, count, key = self._heap[0]
+            if self._deadlines.get(key) == (when, count):
+                return
+            heapq.heappop(self._heap)
+
+    @property
+    def next_deadline(self) -> t.Optional[datetime.datetime]:
+        """The earliest deadline in the scheduler, or None if it's empty."""
+        self._discard_stale()
+        if not self._heap:
+            return None
+        return self._heap[0][0]
+
+    def pop_due(self, now: datetime.datetime) -> t.List[t.Hashable]:
+        """Remove and return every key whose deadline is at or before `now`."""
+        due = []
+        while True:
+            deadline = self.next_deadline
+            if deadline is None or deadline > now:
+                return due
+            _, _, key = heapq.heappop(self._heap)
+            del self._deadlines[key]
+            due.append(key)
+
+    def touch(self, key: t.Hashable) -> None:
+        """
+        Mark a key as changed and wake up whatever is waiting.
+
+        This is safe to call from any thread, which matters because model
+        saves made through sync_to_async happen outside the event loop.
+        """
+        with self._lock:
+            self._dirty.add(key)
+
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pop_dirty(self) -> t.Set[t.Hashable]:
+        """Remove and return every key which has been touched since the last call."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    async def wait(self) -> None:
+        """
+        Sleep until the earliest deadline passes or a key is touched.
+        """
+        self._loop = asyncio.get_running_loop()
+
+        with self._lock:
+            if self._dirty:
+                return
+
+        deadline = self.next_deadline
+        timeout = self.max_sleep
+        if deadline is not None:
+            timeout = min(timeout, (deadline - utcnow()).total_seconds())
+        if timeout <= 0:
+            return
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._wakeup.clear()
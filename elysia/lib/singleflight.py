@@ -0,0 +1,51 @@
+"""Module defining single-flight call deduplication
+
+When several coroutines ask for the same thing at the same time, like a
+page of an admin changelist resolving the same user over and over, there
+is no point in each of them making its own REST call. The first caller
+makes the call, and everyone else who asks for the same key while it is
+in flight waits for that call's result instead.
+
+    * SingleFlight - Class sharing one in-flight call between all concurrent callers with the same key
+"""
+import asyncio
+import typing as t
+
+
+class SingleFlight:
+    """
+    Deduplicator of concurrent calls with the same key.
+
+    The call runs in its own task, so a caller being cancelled doesn't
+    cancel the call for everyone else waiting on it. Nothing is remembered
+    once a call completes; caching results is up to the caller.
+    """
+    def __init__(self) -> None:
+        self.calls: int = 0
+        self.coalesced: int = 0
+        self._inflight: t.Dict[t.Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: t.Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: t.Hashable, func: t.Callable[[], t.Awaitable[t.Any]]) -> t.Any:
+        """Await `func()`, or the call already in flight for `key` if there is one."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.get_running_loop().create_task(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda task: self._done(key, task))
+        return await asyncio.shield(task)
+
+    def _done(self, key: t.Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Every caller may have been cancelled, in which case nobody retrieves this.
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,22 @@
+"""Module defining statistics helpers
+
+Several things in Elysia keep a window of recent samples, like delivery
+lags and write latencies, and report percentiles of them. They all share
+the helper in here, so that a p95 means the same thing everywhere.
+
+    * percentile - Function returning the nearest-rank percentile of a collection of samples
+"""
+import typing as t
+
+
+def percentile(samples: t.Iterable[float], percent: float, is_sorted: bool=False) -> t.Optional[float]:
+    """
+    Return the passed percentile of the samples, or None if there are none.
+
+    Pass `is_sorted` if the samples are already a sorted sequence, so they
+    aren't sorted again for every percentile taken of them.
+    """
+    samples = samples if is_sorted else sorted(samples)
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))]
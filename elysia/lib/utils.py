@@ -19,7 +19,7 @@ It largely contains things that don't fit anywhere else.
     * is_alphabet - Function taking a string and returning a boolean telling of the text is entirely made of alphabet characters
     * lint - Function which performs linting on all files contained under the path
     * ordinal - Function taking an integer and returning its ordinal form (ex: 1 -> 1st, 3 -> 3rd, etc...)
-    * utcnow - Shortcut function to obtain the current UTC datetime object
+    * utcnow - Shortcut function to obtain the current UTC datetime object (or the time of an installed virtual clock)
     * icmp_ping - Function implementing abstraction of ICMP pinging
     * resize_for_upload - Function taking the path to an image and resizing it (if necessary) to be within Discord's upload limits
     * port_in_use - Function taking a TCP/IP port number and returning True if it is in use, and False otherwise
@@ -30,15 +30,16 @@ import asyncio
 import datetime
 import hikari
 import os
-from PIL import Image
 import hashlib
 import string
 import subprocess
 import socket
-import tornado
 import typing as t
 import orjson as json
 
+# PIL and tornado are imported by the few functions which use them, so that
+# importing this module doesn't pay for them on every boot.
+
 
 async def aio_get(
         url: str, 
@@ -47,6 +48,8 @@ async def aio_get(
         valid_responses: t.List[int]=[200],
         ssl: t.Optional[bool]=True
     ) -> t.Union[bytes, str, dict]:
+    import tornado.httpclient
+
     client = tornado.httpclient.AsyncHTTPClient()
     try:
         request = tornado.httpclient.HTTPRequest(
@@ -202,7 +205,13 @@ def strfdelta(
     return fmt.format(**d)
 
 
+# Set by lib.clock.VirtualClock when a simulation is running.
+_clock_override: t.Optional[t.Callable[[], datetime.datetime]] = None
+
+
 def utcnow() -> datetime.datetime:
+    if _clock_override is not None:
+        return _clock_override()
     return datetime.datetime.now(datetime.UTC)
 
 
@@ -217,6 +226,8 @@ def icmp_ping(address: str, count: int=4) -> t.Generator[str, None, None]:
 
 def resize_for_upload(path: str, limit: int=10000000) -> None:
     if os.path.getsize(path) > limit:
+        from PIL import Image
+
         im = Image.open(path)
         w, h = im.size
         im = im.resize((int(w/2), int(h/2)))
@@ -1,9 +1,11 @@
 from django.contrib import admin
 
-from .models import Chore, Accomplishment, Notification, Reminder
+from .models import Chore, Accomplishment, Notification, Reminder, ReminderDelivery, NotifySchedule
 
 
 admin.site.register(Chore)
 admin.site.register(Accomplishment)
 admin.site.register(Notification)
 admin.site.register(Reminder)
+admin.site.register(NotifySchedule)
+admin.site.register(ReminderDelivery)
@@ -1,10 +1,13 @@
 from .chores import Chore, Accomplishment, Notification
-from .reminders import Reminder
+from .reminders import Reminder, ReminderDelivery
+from .schedules import NotifySchedule
 
 
 __all__ = [
     Accomplishment,
     Chore,
     Notification,
-    Reminder
+    NotifySchedule,
+    Reminder,
+    ReminderDelivery
 ]
\ No newline at end of file
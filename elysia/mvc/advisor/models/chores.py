@@ -1,14 +1,17 @@
 from __future__ import annotations
 import datetime
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, pre_delete, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 import hikari
-import oronyx
 import typing as t
 
 from ...core.models import BaseAsyncModel
 from ...discord.models import DiscordBaseModel
 from ....core.conf import Config
+from ....lib.rules import next_occurrence
 from ....lib.utils import get_approx_timedelta
 
 
@@ -21,19 +24,31 @@ class Chore(DiscordBaseModel):
     accomplishments = models.ManyToManyField("Accomplishment", blank=True)
     assign_to = models.ForeignKey("discord.User", default=None, null=True, blank=True, on_delete=models.SET_DEFAULT)
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    # Denormalized from accomplishments so due chores can be found in one query.
+    last_accomplished_at = models.DateTimeField(default=None, null=True, blank=True, editable=False)
+    next_due_at = models.DateTimeField(default=None, null=True, blank=True, editable=False)
 
-        self._last_accomplishment: int | None | datetime.datetime = 0
+    class Meta:
+        indexes = [
+            models.Index(fields=["assign_to", "next_due_at"])
+        ]
 
     def __str__(self) -> str:
         return self.name
+
+    def save(self, *args, **kwargs):
+        self.update_next_due_at()
+        return super().save(*args, **kwargs)
+    
+    async def asave(self, *args, **kwargs):
+        self.update_next_due_at()
+        return await super().asave(*args, **kwargs)
     
     @property
-    def last_accomplishment(self) -> datetime.datetime:
-        if self._last_accomplishment != 0:
-            return self._last_accomplishment # type: ignore
-        raise RuntimeError("prefetch not called.")
+    def last_accomplishment(self) -> t.Optional[datetime.datetime]:
+        if self.last_accomplished_at is None:
+            return None
+        return self.last_accomplished_at.astimezone(conf.timezone)
     
     @property
     def last_acc_shorthand(self) -> str:
@@ -55,33 +70,59 @@ class Chore(DiscordBaseModel):
             return None
         return latest.timestamp
     
-    def needs_doing(self) -> bool:
+    def update_next_due_at(self) -> None:
+        """Recompute `next_due_at` from `last_accomplished_at` and `frequency`."""
+        if self.last_accomplished_at is None:
+            self.next_due_at = None
+        else:
+            future = next_occurrence(self.frequency, self.last_accomplishment)
+            self.next_due_at = future.astimezone(datetime.UTC)
+
+    def refresh_due_state(self) -> None:
+        """Re-read the latest accomplishment from the database and save the due state."""
         last = self.get_last_accomplishment()
-        if not last:
-            return True
-        future = oronyx.get_future(last, self.frequency)
-        return timezone.localtime() > future
+        self.last_accomplished_at = last.astimezone(datetime.UTC) if last else None
+        self.save(update_fields=["last_accomplished_at", "next_due_at"])
     
-    async def aneeds_doing(self) -> bool:
-        last = await self.aget_last_accomplishment()
-        if not last:
+    def needs_doing(self) -> bool:
+        if self.next_due_at is None:
             return True
-        
-        future = oronyx.get_future(last, self.frequency)
-        return timezone.localtime() > future
+        return timezone.now() > self.next_due_at
     
-    async def prefetch(self) -> None:
-        self._last_accomplishment = await self.aget_last_accomplishment()
+    async def aneeds_doing(self) -> bool:
+        return self.needs_doing()
+
+    @classmethod
+    async def abackfill(cls) -> int:
+        """
+        Fill in the due state of chores which predate the denormalized columns.
+        """
+        count = 0
+        queryset = cls.objects.filter(last_accomplished_at__isnull=True, accomplishments__isnull=False).distinct()
+        async for chore in queryset:
+            await sync_to_async(chore.refresh_due_state)()
+            count += 1
+        return count
+
+    def accomplish(self, user) -> Accomplishment:
+        """Record that the passed user accomplished this chore, in one transaction."""
+        with transaction.atomic():
+            accomplishment = Accomplishment.objects.create(user=user)
+            # The m2m_changed receiver below updates the due state.
+            self.accomplishments.add(accomplishment)
+        return accomplishment
+
+    async def aaccomplish(self, user) -> Accomplishment:
+        return await sync_to_async(self.accomplish)(user)
 
     @classmethod
     async def get_split_chores(cls, user) -> t.Tuple[t.List[Chore], t.List[Chore]]:
         finished = []
         unfinished = []
+        now = timezone.now()
 
         async for chore in cls.objects.filter(assign_to=user):
-            await chore.prefetch()
-
-            if await chore.aneeds_doing():    
+            if chore.next_due_at is None or chore.next_due_at <= now:
                 unfinished.append(chore)
             else:
                 finished.append(chore)
@@ -125,3 +166,48 @@ class Notification(BaseAsyncModel):
     @property
     def timestamp(self) -> datetime.datetime:
         return self.utc_timestamp.astimezone(conf.timezone)
+
+    @classmethod
+    def record(cls, user, message_id: int, chores: t.List[Chore]) -> Notification:
+        """
+        Save a notification about the passed chores, and advance the user's
+        `last_notify` to it.
+
+        Everything happens in one transaction, with the chores added through
+        a single bulk insert rather than one `add()` each.
+        """
+        with transaction.atomic():
+            notification = cls.objects.create(user=user, message_id=message_id)
+            through = cls.chores.through
+            through.objects.bulk_create([through(notification_id=notification.id, chore_id=chore.id) for chore in chores])
+
+            user.last_notify = notification.timestamp
+            user.save(update_fields=["last_notify"])
+        return notification
+
+    @classmethod
+    async def arecord(cls, user, message_id: int, chores: t.List[Chore]) -> Notification:
+        return await sync_to_async(cls.record)(user, message_id, chores)
+
+
+@receiver(m2m_changed, sender=Chore.accomplishments.through)
+def _on_accomplishments_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if reverse is False:
+        instance.refresh_due_state()
+    elif pk_set:
+        for chore in Chore.objects.filter(pk__in=pk_set):
+            chore.refresh_due_state()
+
+
+@receiver(pre_delete, sender=Accomplishment)
+def _on_accomplishment_pre_delete(sender, instance, **kwargs):
+    instance._affected_chores = list(instance.chore_set.all())
+
+
+@receiver(post_delete, sender=Accomplishment)
+def _on_accomplishment_post_delete(sender, instance, **kwargs):
+    for chore in getattr(instance, "_affected_chores", []):
+        chore.refresh_due_state()
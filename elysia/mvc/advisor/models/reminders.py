@@ -1,22 +1,31 @@
 from __future__ import annotations
 import datetime
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 import hikari
-import oronyx
+import typing as t
 import zoneinfo
 
-from ...discord.models import DiscordBaseModel
+from ...core.models import BaseAsyncModel
+from ...discord.models import DiscordBaseModel, User
 from ....core.conf import Config
+from ....core.log import logging
+from ....lib.rules import next_occurrence
+from ....lib.scheduler import DeadlineScheduler
 
 
 conf = Config.load()
+logger = logging.getLogger(conf.name).getChild("reminders")
+
+# Woken whenever a reminder changes, so the reminder daemon can reschedule it.
+scheduler: DeadlineScheduler = DeadlineScheduler()
 
 
 class Reminder(DiscordBaseModel):
     user = models.ForeignKey("discord.User", on_delete=models.CASCADE)
     rule = models.CharField(max_length=256)
     utc_last_notify = models.DateTimeField(default=None, null=True, blank=True)
+    next_fire_at = models.DateTimeField(default=None, null=True, blank=True, db_index=True, editable=False)
     recurring = models.BooleanField(default=False)
     text = models.TextField()
 
@@ -27,12 +36,32 @@ class Reminder(DiscordBaseModel):
     def save(self, *args, **kwargs):
         if self.utc_last_notify is None:
             self.utc_last_notify = timezone.localtime()
-        return super().save(*args, *kwargs)
+        self._timezone = self.user.timezone
+        self.update_next_fire_at()
+        result = super().save(*args, **kwargs)
+        scheduler.touch(self.id)
+        return result
     
     async def asave(self, *args, **kwargs):
         if self.utc_last_notify is None:
             self.utc_last_notify = timezone.localtime()
-        return await super().asave(*args, **kwargs)
+        await self.prefetch()
+        self.update_next_fire_at()
+        result = await super().asave(*args, **kwargs)
+        scheduler.touch(self.id)
+        return result
+
+    def delete(self, *args, **kwargs):
+        id = self.id
+        result = super().delete(*args, **kwargs)
+        scheduler.touch(id)
+        return result
+    
+    async def adelete(self, *args, **kwargs):
+        id = self.id
+        result = await super().adelete(*args, **kwargs)
+        scheduler.touch(id)
+        return result
     
     @property
     def timezone(self) -> zoneinfo.ZoneInfo:
@@ -52,29 +81,224 @@ class Reminder(DiscordBaseModel):
     
     @property
     def future(self) -> datetime.datetime:
-        return oronyx.get_future(self.local_last_notify, self.rule)
+        return next_occurrence(self.rule, self.local_last_notify)
     
     @property
     def local_last_notify(self) -> datetime.datetime:
         return self.utc_last_notify.astimezone(zoneinfo.ZoneInfo(self.timezone))
     
+    def update_next_fire_at(self) -> None:
+        """Recompute the UTC time at which this reminder should next fire."""
+        self.next_fire_at = self.future.astimezone(datetime.UTC)
+    
     async def prefetch(self) -> Reminder:
-        r = await Reminder.objects.select_related("user").aget(id=self.id)
-        self._timezone = r.user.timezone
-        self.user = r.user
+        if not self._meta.get_field("user").is_cached(self):
+            self.user = await User.objects.aget(id=self.user_id)
+        self._timezone = self.user.timezone
         return self
-    
-    async def process(self, bot: hikari.GatewayBot, utcnow: datetime.datetime):
-        await self.prefetch()
 
-        if utcnow >= self.future:
-            self.user.attach_bot(bot)
-            await self.user.aresolve_all()
+    @classmethod
+    async def abackfill(cls) -> int:
+        """
+        Compute `next_fire_at` for every reminder which doesn't have one yet.
+
+        Rows created before the column existed come out of the migration
+        with it set to NULL, and the daemon can't see them until this runs.
+        One-shot reminders which were already claimed are NULL too, and are
+        left alone, so they don't fire again.
+        """
+        count = 0
+        queryset = cls.objects.filter(next_fire_at__isnull=True).exclude(recurring=False, reminderdelivery__isnull=False)
+        async for reminder in queryset.select_related("user").distinct():
+            await reminder.asave(update_fields=["next_fire_at"])
+            count += 1
+        return count
+
+    def get_next_after(self, after: datetime.datetime) -> datetime.datetime:
+        """Return the UTC time of the next occurrence after the passed time."""
+        local = after.astimezone(zoneinfo.ZoneInfo(self.timezone))
+        return next_occurrence(self.rule, local).astimezone(datetime.UTC)
+
+    def get_occurrences_until(self, until: datetime.datetime, limit: int=100) -> t.List[datetime.datetime]:
+        """Return up to `limit` occurrences from `next_fire_at` up to `until`, oldest first."""
+        occurrences = []
+        occurrence = self.next_fire_at
+        while occurrence is not None and occurrence <= until and len(occurrences) < limit:
+            occurrences.append(occurrence)
+            occurrence = self.get_next_after(occurrence)
+        return occurrences
+
+    def get_latest_occurrence(self, until: datetime.datetime) -> t.Optional[datetime.datetime]:
+        """
+        Return the latest occurrence at or before `until`, if there is one.
+
+        Rather than walking every occurrence forward from `next_fire_at`,
+        this searches back from `until` in doubling steps until it finds a
+        window with an occurrence in it, then walks forward from there. A
+        reminder which fires every minute and was missed for a month costs
+        a handful of evaluations instead of tens of thousands.
+        """
+        latest = self.next_fire_at
+        if latest is None or latest > until:
+            return None
+
+        step = datetime.timedelta(minutes=1)
+        while until - step > latest:
+            occurrence = self.get_next_after(until - step)
+            if occurrence <= until:
+                latest = occurrence
+                break
+            step *= 2
+
+        while True:
+            occurrence = self.get_next_after(latest)
+            if occurrence > until:
+                return latest
+            latest = occurrence
+
+
+class ReminderDelivery(BaseAsyncModel):
+    """
+    Outbox row recording a single occurrence of a reminder to be delivered.
+
+    Due reminders are claimed into these rows in one transaction, which also
+    advances the reminders themselves. Only then are they sent, and marked
+    as sent. The idempotency key is unique per reminder and occurrence, so
+    an occurrence can't be claimed twice, and anything left pending by a
+    crash is picked back up on the next start.
+    """
+    class State(models.IntegerChoices):
+        PENDING = 0
+        SENT = 1
+        CANCELLED = 2
+        # Given up on, either after too many attempts or an error retrying can't fix.
+        FAILED = 3
+
+    class CollapseRule(models.TextChoices):
+        # Send one delivery for every missed occurrence of a recurring reminder.
+        ALL = "all"
+        # Send one delivery for the most recent missed occurrence.
+        LATEST = "latest"
+        # Send nothing for missed occurrences of recurring reminders.
+        SKIP = "skip"
+
+    reminder = models.ForeignKey("Reminder", default=None, null=True, blank=True, on_delete=models.SET_NULL)
+    user = models.ForeignKey("discord.User", on_delete=models.CASCADE)
+    key = models.CharField(max_length=128, unique=True)
+    occurrence = models.DateTimeField()
+    state = models.IntegerField(choices=State.choices, default=State.PENDING, db_index=True)
+    message_id = models.BigIntegerField(default=None, null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    utc_created = models.DateTimeField(auto_now_add=True)
+    utc_delivered = models.DateTimeField(default=None, null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.key} ({self.State(self.state).label})"
+
+    @staticmethod
+    def get_key(reminder: Reminder, occurrence: datetime.datetime) -> str:
+        return f"reminder:{reminder.id}:{occurrence.astimezone(datetime.UTC).isoformat()}"
+
+    @classmethod
+    def claim_due(
+            cls,
+            now: datetime.datetime,
+            limit: int=100,
+            collapse: ReminderDelivery.CollapseRule=CollapseRule.LATEST,
+            grace: datetime.timedelta=datetime.timedelta(minutes=1)
+        ) -> t.List[Reminder]:
+        """
+        Claim up to `limit` due reminders into pending deliveries.
+
+        Everything happens in one transaction: the delivery rows are created
+        and the claimed reminders are advanced past `now`, so they won't be
+        claimed again. Occurrences more than `grace` old count as missed,
+        and `collapse` decides what happens to missed occurrences of
+        recurring reminders. Collapsing to all of them still delivers at
+        most `limit` per reminder, along with the latest one. Returns the
+        claimed reminders.
+        """
+        with transaction.atomic():
+            due = Reminder.objects.filter(next_fire_at__lte=now).select_related("user").order_by("next_fire_at")
+            reminders = list(due[:limit])
+
+            deliveries = []
+            for reminder in reminders:
+                reminder._timezone = reminder.user.timezone
+                missed = reminder.recurring and now - reminder.next_fire_at > grace
+                last_notify = now
+
+                if not missed:
+                    occurrences = [reminder.next_fire_at]
+                elif collapse == cls.CollapseRule.ALL:
+                    occurrences = reminder.get_occurrences_until(now, limit=limit)
+                    last_notify = occurrences[-1]
+                    if len(occurrences) == limit:
+                        last_notify = reminder.get_latest_occurrence(now)
+                        if last_notify != occurrences[-1]:
+                            logger.warning(
+                                f"Reminder {reminder.id} missed more than {limit} occurrences, "
+                                f"only the first {limit} and the latest will be delivered."
+                            )
+                            occurrences.append(last_notify)
+                else:
+                    last_notify = reminder.get_latest_occurrence(now)
+                    occurrences = [last_notify] if collapse == cls.CollapseRule.LATEST else []
+
+                for occurrence in occurrences:
+                    deliveries.append(cls(
+                        reminder=reminder,
+                        user_id=reminder.user_id,
+                        key=cls.get_key(reminder, occurrence),
+                        occurrence=occurrence
+                    ))
+
+                reminder.utc_last_notify = last_notify
+                if reminder.recurring:
+                    reminder.update_next_fire_at()
+                else:
+                    reminder.next_fire_at = None
+
+            cls.objects.bulk_create(deliveries, ignore_conflicts=True)
+            Reminder.objects.bulk_update(reminders, ["utc_last_notify", "next_fire_at"])
+        return reminders
+
+    @classmethod
+    def get_pending(cls, exclude: t.Iterable[int]=(), limit: int=100):
+        queryset = cls.objects.filter(state=cls.State.PENDING).exclude(id__in=list(exclude))
+        return queryset.select_related("reminder__user").order_by("occurrence")[:limit]
+
+    async def amark_sent(self, message_id: int) -> bool:
+        """Mark this delivery as sent, returning False if something else already had."""
+        updated = await ReminderDelivery.objects.filter(key=self.key, state=self.State.PENDING).aupdate(
+            state=self.State.SENT,
+            message_id=message_id,
+            utc_delivered=timezone.now()
+        )
+        return updated == 1
+
+    async def afail(self, permanent: bool=False, max_attempts: int=10) -> bool:
+        """
+        Record a failed attempt at sending this delivery.
+
+        The delivery stays pending so that it's retried, unless the failure
+        was permanent or this was its last attempt, in which case it's marked
+        as failed. Returns True if it was.
+        """
+        self.attempts += 1
+        failed = permanent or self.attempts >= max_attempts
+        await ReminderDelivery.objects.filter(key=self.key, state=self.State.PENDING).aupdate(
+            attempts=self.attempts,
+            state=self.State.FAILED if failed else self.State.PENDING
+        )
+        return failed
 
-            self.utc_last_notify = utcnow
-            await self.user.obj.send(embed = self.get_embed())
+    async def acancel(self) -> None:
+        await ReminderDelivery.objects.filter(key=self.key, state=self.State.PENDING).aupdate(state=self.State.CANCELLED)
 
-            if self.recurring is False:
-                await self.adelete()
-            else:
-                await self.asave()
\ No newline at end of file
+    @classmethod
+    async def aprune(cls, older_than: datetime.timedelta=datetime.timedelta(days=7)) -> int:
+        """Delete finished deliveries older than the passed age."""
+        cutoff = timezone.now() - older_than
+        count, _ = await cls.objects.exclude(state=cls.State.PENDING).filter(utc_created__lt=cutoff).adelete()
+        return count
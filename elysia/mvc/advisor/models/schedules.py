@@ -0,0 +1,104 @@
+from __future__ import annotations
+import datetime
+from asgiref.sync import sync_to_async
+from django.db import models
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+import typing as t
+
+from ...core.models import BaseAsyncModel
+from ....lib.rules import compile_rule, next_occurrence
+
+
+class NotifySchedule(BaseAsyncModel):
+    user = models.ForeignKey("discord.User", on_delete=models.CASCADE, related_name="notify_schedules")
+    time = models.CharField(max_length=256)
+    next_notify_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'time')
+
+    def __str__(self) -> str:
+        return f"{self.user} at {self.time}"
+
+    @staticmethod
+    def parse(notify_times: str) -> t.List[str]:
+        """Split a comma separated list of notify times, dropping invalid ones and duplicates."""
+        times = []
+        for time in notify_times.split(","):
+            time = " ".join(time.split())
+            if time and time not in times and compile_rule(time) is not None:
+                times.append(time)
+        return times
+
+    @staticmethod
+    def get_next(user, time: str) -> datetime.datetime:
+        last = user.last_notify.astimezone(timezone.get_current_timezone())
+        return next_occurrence(time, last).astimezone(datetime.UTC)
+
+    @classmethod
+    def sync_for(cls, user) -> None:
+        """
+        Bring the schedule rows of a user in line with their notify times.
+
+        Rows for times which were removed are deleted, rows for new times are
+        created, and `next_notify_at` is recomputed from `last_notify` for
+        everything else.
+        """
+        times = cls.parse(user.notify_times)
+        existing = {schedule.time: schedule for schedule in cls.objects.filter(user=user)}
+
+        stale = [schedule.id for time, schedule in existing.items() if time not in times]
+        if stale:
+            cls.objects.filter(id__in=stale).delete()
+
+        created = []
+        updated = []
+        for time in times:
+            next_notify_at = cls.get_next(user, time)
+            if time not in existing:
+                created.append(cls(user=user, time=time, next_notify_at=next_notify_at))
+            elif existing[time].next_notify_at != next_notify_at:
+                existing[time].next_notify_at = next_notify_at
+                updated.append(existing[time])
+
+        if created:
+            cls.objects.bulk_create(created)
+        if updated:
+            cls.objects.bulk_update(updated, ["next_notify_at"])
+
+    @classmethod
+    async def abackfill(cls) -> int:
+        """Create schedule rows for users whose notify times predate this model."""
+        from ...discord.models import User
+
+        count = 0
+        queryset = User.objects.exclude(notify_times="").filter(notify_schedules__isnull=True)
+        async for user in queryset:
+            await sync_to_async(cls.sync_for)(user)
+            count += 1
+        return count
+
+
+def _get_schedule_state(user) -> t.Tuple[t.Any, t.Any]:
+    # Read from __dict__ so that deferred fields aren't loaded just for this.
+    return (user.__dict__.get("notify_times"), user.__dict__.get("last_notify"))
+
+
+@receiver(post_init, sender="discord.User")
+def _on_user_init(sender, instance, **kwargs):
+    instance._schedule_state = _get_schedule_state(instance)
+
+
+@receiver(post_save, sender="discord.User")
+def _on_user_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    if update_fields is not None and not {"notify_times", "last_notify"} & set(update_fields):
+        return
+
+    # Most saves don't touch what the schedules are computed from.
+    state = _get_schedule_state(instance)
+    if not created and state == getattr(instance, "_schedule_state", None):
+        return
+    instance._schedule_state = state
+    NotifySchedule.sync_for(instance)
@@ -1,3 +1,135 @@
+import datetime
 from django.test import TestCase
+import hikari
 
-# Create your tests here.
+from .models import Reminder, ReminderDelivery
+from ..discord.models import User
+from ...bench.fakes import FakeBot
+from ...daemons import advisor
+from ...lib.daemon import Daemon
+
+
+DAILY = "every 1 day at 9:00"
+WEEKLY = "every friday at 23:45"
+
+
+class ReminderTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(id=100000000000000001)
+
+    def make_reminder(self, rule: str, last_notify: datetime.datetime, recurring: bool=True) -> Reminder:
+        reminder = Reminder(user=self.user, rule=rule, recurring=recurring, text="Test", utc_last_notify=last_notify)
+        reminder.save()
+        return reminder
+
+
+class GetLatestOccurrenceTests(ReminderTestCase):
+    def test_matches_walking_every_occurrence(self):
+        now = datetime.datetime(2025, 1, 15, 10, 0, tzinfo=datetime.UTC)
+        for rule, missed in [(DAILY, 30), (WEEKLY, 90)]:
+            reminder = self.make_reminder(rule, now - datetime.timedelta(days=missed))
+            occurrences = reminder.get_occurrences_until(now, limit=10000)
+            self.assertEqual(reminder.get_latest_occurrence(now), occurrences[-1])
+
+    def test_nothing_due(self):
+        now = datetime.datetime(2025, 1, 15, 10, 0, tzinfo=datetime.UTC)
+        reminder = self.make_reminder(DAILY, now)
+        self.assertIsNone(reminder.get_latest_occurrence(now))
+
+
+class ClaimDueTests(ReminderTestCase):
+    now = datetime.datetime(2025, 1, 15, 10, 0, tzinfo=datetime.UTC)
+
+    def claim(self, collapse: ReminderDelivery.CollapseRule) -> Reminder:
+        reminder = self.make_reminder(DAILY, self.now - datetime.timedelta(days=10))
+        self.expected = reminder.get_occurrences_until(self.now, limit=1000)
+        ReminderDelivery.claim_due(self.now, collapse=collapse)
+        reminder.refresh_from_db()
+        return reminder
+
+    def get_occurrences(self):
+        return list(ReminderDelivery.objects.order_by("occurrence").values_list("occurrence", flat=True))
+
+    def test_one_shot(self):
+        reminder = self.make_reminder(DAILY, self.now - datetime.timedelta(days=1), recurring=False)
+        occurrence = reminder.next_fire_at
+
+        claimed = ReminderDelivery.claim_due(occurrence + datetime.timedelta(seconds=10))
+        reminder.refresh_from_db()
+
+        self.assertEqual([r.id for r in claimed], [reminder.id])
+        self.assertEqual(self.get_occurrences(), [occurrence])
+        self.assertIsNone(reminder.next_fire_at)
+
+    def test_all(self):
+        reminder = self.claim(ReminderDelivery.CollapseRule.ALL)
+        self.assertEqual(self.get_occurrences(), self.expected)
+        self.assertEqual(reminder.utc_last_notify, self.expected[-1])
+        self.assertGreater(reminder.next_fire_at, self.now)
+
+    def test_latest(self):
+        reminder = self.claim(ReminderDelivery.CollapseRule.LATEST)
+        self.assertEqual(self.get_occurrences(), [self.expected[-1]])
+        self.assertEqual(reminder.utc_last_notify, self.expected[-1])
+        self.assertGreater(reminder.next_fire_at, self.now)
+
+    def test_skip(self):
+        reminder = self.claim(ReminderDelivery.CollapseRule.SKIP)
+        self.assertEqual(self.get_occurrences(), [])
+        self.assertEqual(reminder.utc_last_notify, self.expected[-1])
+        self.assertGreater(reminder.next_fire_at, self.now)
+
+    def test_not_claimed_twice(self):
+        self.claim(ReminderDelivery.CollapseRule.ALL)
+        self.assertEqual(ReminderDelivery.claim_due(self.now), [])
+        self.assertEqual(len(self.get_occurrences()), len(self.expected))
+
+
+class ReminderDaemonTests(ReminderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bot = FakeBot()
+        self.bot.cache.add_user(self.user.id)
+
+        advisor.reminder_scheduler.clear()
+        advisor.reminder_scheduler.max_sleep = 0
+        advisor.dm_coalescer.window = 0.01
+
+    async def run_daemon(self) -> None:
+        daemon: Daemon = advisor.reminder_daemon()
+        daemon.attach_bot(self.bot)
+        await daemon._callback(self.bot)
+
+    async def test_values_are_iterable(self):
+        await Reminder.objects.acreate(user=self.user, rule=DAILY, text="Test")
+        rows = [row async for row in Reminder.objects.values_list("id", "next_fire_at")]
+        self.assertEqual(len(rows), 1)
+
+    async def test_seed_and_drain(self):
+        last_notify = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=2)
+        reminder = Reminder(user=self.user, rule=DAILY, recurring=True, text="Test", utc_last_notify=last_notify)
+        await reminder.asave()
+
+        await self.run_daemon()
+
+        self.assertTrue(advisor.reminder_scheduler.seeded)
+        self.assertIn(reminder.id, advisor.reminder_scheduler)
+        self.assertEqual(self.bot.rest.calls["create_message"], 1)
+        delivery = await ReminderDelivery.objects.aget(reminder=reminder)
+        self.assertEqual(delivery.state, ReminderDelivery.State.SENT)
+
+    async def test_permanent_failure(self):
+        async def send(*args, **kwargs):
+            raise hikari.ForbiddenError(url="", headers={}, raw_body=None, message="Cannot send messages to this user")
+        self.bot.cache.get_user(self.user.id).send = send
+
+        last_notify = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=2)
+        reminder = Reminder(user=self.user, rule=DAILY, recurring=False, text="Test", utc_last_notify=last_notify)
+        await reminder.asave()
+
+        await self.run_daemon()
+
+        delivery = await ReminderDelivery.objects.aget(user_id=self.user.id)
+        self.assertEqual(delivery.state, ReminderDelivery.State.FAILED)
+        self.assertEqual(delivery.attempts, 1)
+        self.assertFalse(await Reminder.objects.filter(id=reminder.id).aexists())
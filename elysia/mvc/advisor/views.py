@@ -1,15 +1,15 @@
 from django.http import HttpRequest, HttpResponse
-import oronyx
 
 from ..core.utils import template
 from ..core.oauth2 import require_auth
-from .models import Chore, Accomplishment, Reminder
+from .models import Chore, Reminder
 from ..discord.models import User
+from ...lib.rules import compile_rule
 
 
 async def oronyx_eval(request: HttpRequest) -> HttpResponse:
     rule = request.POST['rule']
-    scheduler = oronyx.get_scheduler(rule)
+    scheduler = compile_rule(rule, interactive=True)
     if scheduler:
         return HttpResponse(scheduler.regex)
     else:
@@ -41,9 +41,7 @@ async def accomplish(request: HttpRequest, chore_id: int) -> HttpResponse:
     user = await User.objects.aget(id=uid)
     chore = await Chore.objects.aget(id=chore_id)
 
-    accomplishment = Accomplishment(user=user)
-    await accomplishment.asave()
-    await chore.accomplishments.aadd(accomplishment)
+    await chore.aaccomplish(user)
 
     return await get_chores(request) # type: ignore
 
@@ -1,20 +1,28 @@
 from django.db import models
-import hikari
+import typing as t
+
+from .cache import resolution_cache, role_index
 
 
 class BaseIDField(models.BigIntegerField):
+    # The kind of object this field's IDs are cached under in the resolution cache.
+    KIND: t.Optional[str] = None
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    async def afetch(self, id, fetch: t.Callable[[], t.Awaitable[t.Any]]) -> t.Any:
+        """Fetch an object over REST through the resolution cache."""
+        return await resolution_cache.aresolve(self.KIND, id, fetch)
+
 
 class UserIDField(BaseIDField):
+    KIND = "user"
+
     async def aresolve(self, bot, id):
         user = bot.cache.get_user(id)
         if user is None:
-            try:
-                user = await bot.rest.fetch_user(id)
-            except hikari.NotFoundError as e:
-                return e
+            user = await self.afetch(id, lambda: bot.rest.fetch_user(id))
         return user
     
     def resolve(self, bot, id):
@@ -22,13 +30,12 @@ class UserIDField(BaseIDField):
 
 
 class GuildIDField(BaseIDField):
+    KIND = "guild"
+
     async def aresolve(self, bot, id):
         guild = bot.cache.get_guild(id)
         if guild is None:
-            try:
-                guild = await bot.rest.fetch_guild(id)
-            except hikari.NotFoundError as e:
-                return e
+            guild = await self.afetch(id, lambda: bot.rest.fetch_guild(id))
         return guild
     
     def resolve(self, bot, id):
@@ -38,13 +45,12 @@ class GuildIDField(BaseIDField):
 
 
 class ChannelIDField(BaseIDField):
+    KIND = "channel"
+
     async def aresolve(self, bot, id):
         channel = bot.cache.get_guild_channel(id)
         if channel is None:
-            try:
-                channel = await bot.rest.fetch_channel(id)
-            except hikari.NotFoundError as e:
-                return e
+            channel = await self.afetch(id, lambda: bot.rest.fetch_channel(id))
         return channel
     
     def resolve(self, bot, id):
@@ -66,15 +72,11 @@ class ChannelTypeField(models.CharField):
 
 
 class RoleIDField(BaseIDField):
+    # Roles resolve through the role index, not the resolution cache.
     async def aresolve(self, bot, id):
         role = bot.cache.get_role(id)
         if role is None:
-            for _, guild in bot.cache.get_guilds_view().items():
-                roles = await guild.fetch_roles()
-                roles = filter(lambda r: r.id == id, roles)
-                if len(roles) == 0:
-                    raise hikari.NotFoundError(f"The role ID {id} could not be resolved.")
-                role = roles[0]
+            role = await role_index.aresolve(bot, id)
         return role
     
     def resolve(self, bot, id):
@@ -0,0 +1,204 @@
+"""Module defining the Discord ID resolution cache
+
+When an ID can't be found in the bot's cache, the ID fields fall back to
+fetching it over REST. Without this, that happens every single time, and a
+user who left every shared guild costs a REST call on every daemon tick
+and every page view. Results are remembered here for a while, including
+NotFoundErrors, so that missing objects are cheap to look up too, and
+concurrent lookups of the same ID share a single REST call.
+
+    * ResolutionStats - Dataclass holding the counters of the resolution cache
+    * ResolutionCache - Class implementing a size-bounded cache of REST resolutions with separate positive and negative TTLs
+    * resolution_cache - The resolution cache shared by every ID field
+    * RoleIndex - Class caching the roles of each guild, so that role IDs can be resolved with one REST call per guild
+    * role_index - The role index used by role ID fields
+"""
+from __future__ import annotations
+import dataclasses
+import hikari
+import time
+import typing as t
+
+from ....lib.cache import CacheStats, LRUCache, MISSING
+from ....lib.rest import Priority
+from ....lib.singleflight import SingleFlight
+
+
+@dataclasses.dataclass
+class ResolutionStats:
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    rest_calls: int = 0
+    # Lookups which joined a REST call already in flight for the same ID.
+    coalesced: int = 0
+    invalidations: int = 0
+
+    @property
+    def ratio(self) -> float:
+        total = self.hits + self.negative_hits + self.misses
+        return (self.hits + self.negative_hits) / total if total else 0.0
+
+
+class ResolutionCache:
+    """
+    Cache of objects resolved over REST, keyed by kind and ID.
+
+    Args:
+        positive_ttl (float): How long in seconds a fetched object is kept.
+        negative_ttl (float): How long in seconds a NotFoundError is kept.
+            This is shorter, since something missing may well show up again.
+        maxsize (int): The most entries the cache will hold.
+    """
+    def __init__(self, positive_ttl: float=300.0, negative_ttl: float=60.0, maxsize: int=4096) -> None:
+        self.positive_ttl: float = positive_ttl
+        self.negative_ttl: float = negative_ttl
+        self.stats: ResolutionStats = ResolutionStats()
+        self._entries: LRUCache = LRUCache(maxsize=maxsize)
+        self._flights: SingleFlight = SingleFlight()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, kind: str, id: int) -> t.Any:
+        """Return the cached resolution of an ID, or MISSING if there isn't a live one."""
+        entry = self._entries.get((kind, int(id)))
+        if entry is not MISSING:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                if isinstance(value, Exception):
+                    self.stats.negative_hits += 1
+                else:
+                    self.stats.hits += 1
+                return value
+            self._entries.invalidate((kind, int(id)))
+
+        self.stats.misses += 1
+        return MISSING
+
+    def set(self, kind: str, id: int, value: t.Any) -> None:
+        ttl = self.negative_ttl if isinstance(value, Exception) else self.positive_ttl
+        self._entries.set((kind, int(id)), (value, time.monotonic() + ttl))
+
+    def invalidate(self, kind: str, id: int) -> None:
+        if (kind, int(id)) in self._entries:
+            self.stats.invalidations += 1
+        self._entries.invalidate((kind, int(id)))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def aresolve(self, kind: str, id: int, fetch: t.Callable[[], t.Awaitable[t.Any]]) -> t.Any:
+        """
+        Return the cached resolution of an ID, calling `fetch` on a miss.
+
+        Like the ID fields themselves, a NotFoundError raised by `fetch` is
+        returned rather than raised. Any other exception isn't cached. If the
+        same ID is already being fetched, this waits for that fetch instead
+        of starting another one.
+        """
+        value = self.get(kind, id)
+        if value is not MISSING:
+            return value
+
+        async def fetch_and_set():
+            self.stats.rest_calls += 1
+            try:
+                value = await fetch()
+            except hikari.NotFoundError as e:
+                value = e
+            self.set(kind, id, value)
+            return value
+
+        key = (kind, int(id))
+        if key in self._flights:
+            self.stats.coalesced += 1
+        return await self._flights.do(key, fetch_and_set)
+
+
+resolution_cache: ResolutionCache = ResolutionCache()
+
+
+class RoleIndex:
+    """
+    Per-guild index of roles fetched over REST.
+
+    Discord has no endpoint for fetching a single role, only all of a
+    guild's roles. The guild a role belongs to comes from the database, and
+    the whole role list of that guild is fetched once and kept, so every
+    other role in it resolves without REST. Role events for a guild drop
+    its entry.
+
+    Args:
+        ttl (float): How long in seconds the roles of a guild are kept.
+        maxsize (int): The most guilds whose roles are kept at once.
+    """
+    def __init__(self, ttl: float=300.0, maxsize: int=256) -> None:
+        self.ttl: float = ttl
+        self.fetches: int = 0
+        self._guilds: LRUCache = LRUCache(maxsize=maxsize)
+        self._role_guilds: LRUCache = LRUCache(maxsize=maxsize * 64)
+        self._flights: SingleFlight = SingleFlight()
+
+    def __len__(self) -> int:
+        return len(self._guilds)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._guilds.stats
+
+    def invalidate(self, guild_id: int) -> None:
+        self._guilds.invalidate(int(guild_id))
+
+    async def aget_roles(self, bot, guild_id: int, priority: t.Optional[Priority]=None) -> t.Dict[int, hikari.Role]:
+        """
+        Return the roles of a guild by ID, fetching them if they aren't cached.
+
+        If `priority` is passed, a REST budget token of that priority is
+        taken before fetching, and only if there is anything to fetch.
+        """
+        guild_id = int(guild_id)
+        entry = self._guilds.get(guild_id)
+        if entry is not MISSING:
+            roles, expires_at = entry
+            if expires_at > time.monotonic():
+                return roles
+
+        async def fetch():
+            if priority is not None:
+                await bot.rest_budget.acquire(priority)
+            self.fetches += 1
+            roles = {role.id: role for role in await bot.rest.fetch_roles(guild_id)}
+            self._guilds.set(guild_id, (roles, time.monotonic() + self.ttl))
+            return roles
+        return await self._flights.do(guild_id, fetch)
+
+    async def aresolve(self, bot, id: int) -> t.Any:
+        """
+        Resolve a role by ID.
+
+        Like the ID fields themselves, a NotFoundError is returned rather
+        than raised, including when the role isn't in the database.
+        """
+        from ..models import Role
+
+        id = int(id)
+        guild_id = self._role_guilds.get(id)
+        if guild_id is MISSING:
+            guild_id = await Role.objects.filter(id=id).values_list("guild_id", flat=True).afirst()
+            if guild_id is None:
+                return hikari.NotFoundError(url="", headers={}, raw_body=None, message=f"The role ID {id} is not in the database.")
+            self._role_guilds.set(id, guild_id)
+
+        try:
+            roles = await self.aget_roles(bot, guild_id)
+        except hikari.NotFoundError as e:
+            return e
+
+        role = roles.get(id)
+        if role is None:
+            return hikari.NotFoundError(url="", headers={}, raw_body=None, message=f"The role ID {id} could not be resolved.")
+        return role
+
+
+role_index: RoleIndex = RoleIndex()
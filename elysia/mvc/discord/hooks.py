@@ -1,7 +1,14 @@
+from asgiref.sync import sync_to_async
+import asyncio
+from django.db import transaction
 import hikari
 import hikari.channels
+import typing as t
 
+from .fields.cache import resolution_cache, role_index
+from .ingest import ingest_queue
 from .models import User, Guild, Channel, Role
+from ...lib.rest import Priority
 
 
 def handle_events(*event_classes):
@@ -14,139 +21,338 @@ def handle_events(*event_classes):
     return inner
 
 
+async def fetch_guild(bot, id: int) -> hikari.RESTGuild:
+    """
+    Fetch a guild over REST at maintenance priority.
+
+    This goes through the resolution cache, so a guild checked earlier in
+    the same model update, or being fetched by something else right now,
+    doesn't cost another REST call. Unlike the ID fields, a NotFoundError
+    is raised.
+    """
+    async def fetch():
+        await bot.rest_budget.acquire(Priority.MAINTENANCE)
+        return await bot.rest.fetch_guild(id)
+
+    guild = await resolution_cache.aresolve("guild", id, fetch)
+    if isinstance(guild, Exception):
+        raise guild
+    return guild
+
+
+class ModelReconciler:
+    """
+    Runner of full model reconciliation as a debounced background job.
+
+    Guild events keep the models in sync incrementally, so a full pass is
+    only needed to catch whatever those missed. Every request made while a
+    run is already scheduled is merged into it, and a request made while
+    one is running schedules exactly one more run after it.
+
+    Args:
+        debounce (float): How long in seconds a requested run waits for
+            other requests to merge into it.
+    """
+    def __init__(self, debounce: float=30.0) -> None:
+        self.debounce: float = debounce
+        self.runs: int = 0
+        self.requests: int = 0
+        self.last_completed: t.Optional[float] = None
+        self.last_duration: t.Optional[float] = None
+        self._handle: t.Optional[asyncio.TimerHandle] = None
+        self._task: t.Optional[asyncio.Task] = None
+        self._pending: bool = False
+        self._closed: bool = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def request(self, bot, delay: t.Optional[float]=None) -> None:
+        """Ask for a full reconciliation to run once the debounce window passes."""
+        if self._closed:
+            return
+
+        self.requests += 1
+        if self.running:
+            self._pending = True
+            return
+        if self._handle is None:
+            loop = asyncio.get_running_loop()
+            self._handle = loop.call_later(self.debounce if delay is None else delay, self._start, bot)
+
+    def _start(self, bot) -> None:
+        self._handle = None
+        self._task = asyncio.get_running_loop().create_task(self.run(bot), name="model-reconciliation")
+
+    async def run(self, bot) -> None:
+        """Run a full reconciliation right away, recording it like a requested one."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        cancelled = False
+        try:
+            await DiscordEventHandler.run_model_update(bot)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception:
+            bot.logger.exception("Model reconciliation failed.")
+        finally:
+            self.runs += 1
+            self.last_duration = loop.time() - start
+            self.last_completed = loop.time()
+            self._task = None
+            # A cancelled run is being shut down, and mustn't schedule another.
+            if self._pending and not cancelled:
+                self._pending = False
+                self.request(bot)
+
+    async def wait(self) -> None:
+        """Wait for the run in progress, if there is one."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def cancel(self) -> None:
+        """Cancel any scheduled or running reconciliation, and refuse any more requests."""
+        self._closed = True
+        self._pending = False
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._task is not None:
+            self._task.cancel()
+
+
+reconciler: ModelReconciler = ModelReconciler()
+
+
 class DiscordEventHandler:
     @staticmethod
     @handle_events(hikari.GuildEvent)
     async def handle_guild_event(event):
-        if isinstance(event, hikari.GuildJoinEvent) or isinstance(event, hikari.GuildLeaveEvent):
-            await DiscordEventHandler.run_model_update(event.app)
+        resolution_cache.invalidate("guild", event.guild_id)
+        role_index.invalidate(event.guild_id)
+        if isinstance(event, hikari.GuildJoinEvent) or isinstance(event, hikari.GuildAvailableEvent):
+            await DiscordEventHandler.sync_guild(event)
+        if isinstance(event, hikari.GuildLeaveEvent):
+            await DiscordEventHandler.drop_guild(event)
     
     @staticmethod
     @handle_events(hikari.ChannelEvent)
     async def handle_channel_event(event):
+        resolution_cache.invalidate("channel", event.channel_id)
         if isinstance(event, hikari.GuildChannelDeleteEvent):
-            channel = await Channel.objects.aget(id=event.channel_id)
-            await channel.adelete()
-        if isinstance(event, hikari.GuildChannelCreateEvent):
-            guild = await Guild.objects.aget(id=event.guild_id)
-            channel = Channel(id=event.channel_id, guild=guild)
-            await channel.asave()
+            ingest_queue.delete(Channel, event.channel_id)
+        if isinstance(event, hikari.GuildChannelCreateEvent) or isinstance(event, hikari.GuildChannelUpdateEvent):
+            if event.channel.type in CHANNEL_TYPES:
+                ingest_queue.upsert(Channel, event.channel_id, type=CHANNEL_TYPES[event.channel.type], guild_id=event.guild_id)
     
     @staticmethod
     @handle_events(hikari.MemberEvent)
     async def handle_member_event(event):
-        if isinstance(event, hikari.MemberCreateEvent):
-            try:
-                await User.objects.aget(id=event.user.id)
-            except User.DoesNotExist:
-                user = User(id=event.user.id)
-                await user.asave()
+        resolution_cache.invalidate("user", event.user_id)
+        if isinstance(event, hikari.MemberCreateEvent) or isinstance(event, hikari.MemberUpdateEvent):
+            ingest_queue.upsert(User, event.user_id)
 
     @staticmethod
     @handle_events(hikari.RoleEvent)
     async def handle_role_event(event):
-        if isinstance(event, hikari.RoleCreateEvent):
-            guild = await Guild.objects.aget(id=event.guild_id)
-            role = Role(id=event.role_id, guild=guild)
-            await role.asave()
+        role_index.invalidate(event.guild_id)
+        if isinstance(event, hikari.RoleCreateEvent) or isinstance(event, hikari.RoleUpdateEvent):
+            ingest_queue.upsert(Role, event.role_id, guild_id=event.guild_id)
         if isinstance(event, hikari.RoleDeleteEvent):
-            role = await Role.objects.aget(id=event.role_id)
-            await role.adelete()
+            ingest_queue.delete(Role, event.role_id)
+
+    @staticmethod
+    async def sync_guild(event: hikari.GuildJoinEvent | hikari.GuildAvailableEvent) -> None:
+        """
+        Bring the models of a single guild in line with the guild payload of an event.
+
+        The guild, its members, and its channels and roles are created if
+        they're missing, and channels and roles which aren't in the payload
+        anymore are deleted. Nothing outside of the guild is touched.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        channels = {id: CHANNEL_TYPES[channel.type] for id, channel in event.channels.items() if channel.type in CHANNEL_TYPES}
+        counts = await sync_to_async(_sync_guild)(
+            event.guild_id,
+            set(event.members.keys()),
+            channels,
+            set(event.roles.keys())
+        )
+
+        elapsed = round((loop.time() - start) * 1000, 2)
+        summary = ", ".join([f"{count} {name}" for name, count in counts.items()])
+        event.app.logger.info(f"Synced guild ID: {event.guild_id} in {elapsed} ms ({summary}).")
+
+    @staticmethod
+    async def drop_guild(event: hikari.GuildLeaveEvent) -> None:
+        """Delete a guild which was left, along with its channels and roles."""
+        deleted, _ = await Guild.objects.filter(id=event.guild_id).adelete()
+        if deleted:
+            event.app.logger.warning(f"Deleted guild ID: {event.guild_id} and its channels and roles, since it was left.")
 
     @staticmethod
     async def run_model_update(bot):
-        for _, user in bot.cache.get_users_view().items():
-            try:
-                await User.objects.aget(id=user.id)
-            except User.DoesNotExist:
-                user = User(id=user.id)
-                await user.asave()
-        
-        guilds = []
-        for _, guild in bot.cache.get_guilds_view().items():
-            guilds.append(guild.id)
-            try:
-                await Guild.objects.aget(id=guild.id)
-            except Guild.DoesNotExist:
-                guild = Guild(id=guild.id)
-                await guild.asave()
-        
-        async for guild in Guild.objects.all():
-            try:
-                await bot.rest.fetch_guild(guild.id)
-            except (hikari.UnauthorizedError, hikari.NotFoundError):
-                async for channel in Channel.objects.filter(guild_id=guild.id):
-                    bot.logger.warning(f"Deleting channel ID: {channel.id} since its guild is missing.")
-                    await channel.adelete()
-                async for role in Role.objects.filter(guild_id=guild.id):
-                    bot.logger.warning(f"Deleting role ID: {role.id} since its guild is missing.")
-                    await role.adelete()
-                bot.logger.warning(f"Deleting Guild ID: {guild.id} since it can no longer be resolved.")
-                await guild.adelete()
-
-        channels = []
-        for _, channel in bot.cache.get_guild_channels_view().items():
-            channels.append(channel.id)
-            try:
-                await Channel.objects.aget(id=channel.id)
-            except Channel.DoesNotExist:
-                if channel.type == hikari.channels.ChannelType.GUILD_TEXT:
-                    type = 'GUILD_TEXT'
-                elif channel.type == hikari.channels.ChannelType.GUILD_VOICE:
-                    type = 'GUILD_VOICE'
-                else:
-                    continue
-                guild = await Guild.objects.aget(id=channel.guild_id, bot=bot, resolve=False)
-                channel = Channel(id=channel.id, type=type, guild=guild)
-                await channel.asave()
-        
-        guild_channel_mapping = {}
-        async for channel in Channel.objects.all():
-            guild = (await Channel.objects.select_related('guild').aget(id=channel.id)).guild
-            try:
-                if channel.id not in guild_channel_mapping[str(guild.id)]:
-                    bot.logger.warning(f"Deleting channel ID: {channel.id} since it can no longer be resolved.")
-                    await channel.adelete()
-            except KeyError:
-                try:
-                    await bot.rest.fetch_guild(guild.id)
-
-                    guild_channel_mapping[str(guild.id)] = list([c.id for c in (await bot.rest.fetch_guild_channels(guild.id))])
-                    if channel.id not in guild_channel_mapping[str(guild.id)]:
-                        bot.logger.warning(f"Deleting channel ID: {channel.id} since it can no longer be resolved.")
-                        await channel.adelete()
-                except hikari.errors.NotFoundError:
-                    bot.logger.warning(f"Deleting channel ID: {channel.id} since its guild is missing.")
-                    await channel.adelete()                
-        
-        roles = []
-        for _, role in bot.cache.get_roles_view().items():
-            roles.append(role.id)
+        """
+        Bring the Discord models in line with the bot's cache.
+
+        Every table's IDs are loaded once and diffed against the cache, and
+        the differences are applied in bulk, one transaction per table. REST
+        is only used to double check guilds, channels and roles which the
+        cache doesn't know about before deleting them.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        # Users are only ever added, never removed.
+        phase = loop.time()
+        cached = set(bot.cache.get_users_view().keys())
+        existing = await sync_to_async(_get_ids)(User)
+        created, _ = await sync_to_async(_reconcile)(User, [User(id=id) for id in cached - existing], [])
+        _log_phase(bot, "users", phase, len(cached), len(existing), created, 0)
+
+        phase = loop.time()
+        cached = set(bot.cache.get_guilds_view().keys())
+        existing = await sync_to_async(_get_ids)(Guild)
+        missing = []
+        for id in existing - cached:
             try:
-                await Role.objects.aget(id=role.id)
-            except Role.DoesNotExist:
-                guild = await Guild.objects.aget(id=role.guild_id, bot=bot, resolve=False)
-                role = Role(id=role.id, guild_id=role.guild_id)
-                await role.asave()
-        
-        guild_role_mapping = {}
-        async for role in Role.objects.all():
-            guild = (await Role.objects.select_related('guild').aget(id=role.id)).guild
+                await fetch_guild(bot, id)
+            except (hikari.UnauthorizedError, hikari.ForbiddenError, hikari.NotFoundError):
+                missing.append(id)
+        if missing:
+            bot.logger.warning(f"Deleting {len(missing)} guild(s), along with their channels and roles, since they can no longer be resolved: {missing}")
+        created, deleted = await sync_to_async(_reconcile)(Guild, [Guild(id=id) for id in cached - existing], missing)
+        _log_phase(bot, "guilds", phase, len(cached), len(existing), created, deleted)
+        guilds = (existing | cached) - set(missing)
+
+        phase = loop.time()
+        channels = bot.cache.get_guild_channels_view()
+        existing = await sync_to_async(_get_ids)(Channel)
+        create = []
+        for id, channel in channels.items():
+            if id in existing or channel.guild_id not in guilds or channel.type not in CHANNEL_TYPES:
+                continue
+            create.append(Channel(id=id, type=CHANNEL_TYPES[channel.type], guild_id=channel.guild_id))
+
+        stale = existing - set(channels.keys())
+        stale = await _confirm_stale(bot, Channel, stale, set(bot.cache.get_guilds_view().keys()), _fetch_channel_ids)
+        if stale:
+            bot.logger.warning(f"Deleting {len(stale)} channel(s) since they can no longer be resolved: {sorted(stale)}")
+        created, deleted = await sync_to_async(_reconcile)(Channel, create, stale)
+        _log_phase(bot, "channels", phase, len(channels), len(existing), created, deleted)
+
+        phase = loop.time()
+        roles = bot.cache.get_roles_view()
+        existing = await sync_to_async(_get_ids)(Role)
+        create = [Role(id=id, guild_id=role.guild_id) for id, role in roles.items() if id not in existing and role.guild_id in guilds]
+
+        stale = existing - set(roles.keys())
+        stale = await _confirm_stale(bot, Role, stale, set(bot.cache.get_guilds_view().keys()), _fetch_role_ids)
+        if stale:
+            bot.logger.warning(f"Deleting {len(stale)} role(s) since they were not in the cache: {sorted(stale)}")
+        created, deleted = await sync_to_async(_reconcile)(Role, create, stale)
+        _log_phase(bot, "roles", phase, len(roles), len(existing), created, deleted)
+
+        bot.logger.info(f"Model update completed in {round((loop.time() - start) * 1000, 2)} ms.")
+
+
+# The channel types which are stored in the database.
+CHANNEL_TYPES: t.Dict[hikari.ChannelType, str] = {
+    hikari.channels.ChannelType.GUILD_TEXT: 'GUILD_TEXT',
+    hikari.channels.ChannelType.GUILD_VOICE: 'GUILD_VOICE',
+}
+
+# Rows written or deleted per statement during reconciliation.
+RECONCILE_BATCH_SIZE: int = 500
+
+
+def _get_ids(model, **filters) -> t.Set[int]:
+    return set(model.objects.filter(**filters).values_list("id", flat=True))
+
+
+def _reconcile(model, create: t.List, delete: t.Iterable[int]) -> t.Tuple[int, int]:
+    """Create and delete rows of a model in bulk, in one transaction. Returns how many of each."""
+    delete = list(delete)
+    with transaction.atomic():
+        if create:
+            model.objects.bulk_create(create, ignore_conflicts=True, batch_size=RECONCILE_BATCH_SIZE)
+        for start in range(0, len(delete), RECONCILE_BATCH_SIZE):
+            model.objects.filter(id__in=delete[start:start + RECONCILE_BATCH_SIZE]).delete()
+    return len(create), len(delete)
+
+
+def _sync_guild(guild_id: int, members: t.Set[int], channels: t.Dict[int, str], roles: t.Set[int]) -> t.Dict[str, int]:
+    with transaction.atomic():
+        Guild.objects.bulk_create([Guild(id=guild_id)], ignore_conflicts=True)
+        User.objects.bulk_create([User(id=id) for id in members], ignore_conflicts=True, batch_size=RECONCILE_BATCH_SIZE)
+
+        Channel.objects.bulk_create(
+            [Channel(id=id, type=type, guild_id=guild_id) for id, type in channels.items()],
+            ignore_conflicts=True,
+            batch_size=RECONCILE_BATCH_SIZE
+        )
+        _, deleted = Channel.objects.filter(guild_id=guild_id).exclude(id__in=list(channels.keys())).delete()
+        stale_channels = deleted.get(Channel._meta.label, 0)
+
+        Role.objects.bulk_create([Role(id=id, guild_id=guild_id) for id in roles], ignore_conflicts=True, batch_size=RECONCILE_BATCH_SIZE)
+        _, deleted = Role.objects.filter(guild_id=guild_id).exclude(id__in=list(roles)).delete()
+        stale_roles = deleted.get(Role._meta.label, 0)
+
+    return {
+        'member(s)': len(members),
+        'channel(s)': len(channels),
+        'role(s)': len(roles),
+        'stale channel(s) deleted': stale_channels,
+        'stale role(s) deleted': stale_roles,
+    }
+
+
+async def _fetch_channel_ids(bot, guild_id: int) -> t.Set[int]:
+    await bot.rest_budget.acquire(Priority.MAINTENANCE)
+    return set([channel.id for channel in await bot.rest.fetch_guild_channels(guild_id)])
+
+
+async def _fetch_role_ids(bot, guild_id: int) -> t.Set[int]:
+    return set((await role_index.aget_roles(bot, guild_id, priority=Priority.MAINTENANCE)).keys())
+
+
+async def _confirm_stale(bot, model, stale: t.Set[int], cached_guilds: t.Set[int], fetch_ids) -> t.Set[int]:
+    """
+    Narrow down rows missing from the cache to those which are really gone.
+
+    The cache is the authority on guilds it knows about. Rows belonging to
+    any other guild are checked against that guild's REST listing, which
+    is fetched once per guild.
+    """
+    if not stale:
+        return stale
+
+    guild_ids = await sync_to_async(lambda: dict(model.objects.filter(id__in=list(stale)).values_list("id", "guild_id")))()
+    confirmed = set()
+    listings: t.Dict[int, t.Set[int]] = {}
+    for id in stale:
+        guild_id = guild_ids.get(id)
+        if guild_id is None or guild_id in cached_guilds:
+            confirmed.add(id)
+            continue
+
+        if guild_id not in listings:
             try:
-                if role.id not in guild_role_mapping[str(guild.id)]:
-                    bot.logger.warning(f"Deleting role ID: {role.id} since it was not in the cache.")
-                    await role.adelete()
-            except KeyError:
-                try:
-                    await bot.rest.fetch_guild(guild.id)
-                
-                    guild_role_mapping[str(guild.id)] = list([r.id for r in (await bot.rest.fetch_roles(guild.id))])
-                    if role.id not in guild_role_mapping[str(guild.id)]:
-                        bot.logger.warning(f"Deleting role ID: {role.id} since it was not in the cache.")
-                        await role.adelete()
-                except hikari.errors.NotFoundError:
-                    bot.logger.warning(f"Deleting role ID: {role.id} since its guild is missing.")
-                    await role.adelete()
-        
-        await bot.permissions_root.ensure_objects()
-        await bot.permissions_root.delete_unused()
\ No newline at end of file
+                listings[guild_id] = await fetch_ids(bot, guild_id)
+            except hikari.NotFoundError:
+                listings[guild_id] = set()
+        if id not in listings[guild_id]:
+            confirmed.add(id)
+    return confirmed
+
+
+def _log_phase(bot, name: str, start: float, cached: int, existing: int, created: int, deleted: int) -> None:
+    elapsed = round((asyncio.get_running_loop().time() - start) * 1000, 2)
+    bot.logger.info(
+        f"Model update: {name} done in {elapsed} ms "
+        f"({cached} cached, {existing} stored, {created} created, {deleted} deleted)."
+    )
@@ -0,0 +1,187 @@
+"""Module defining the gateway ingestion queue
+
+Member, role and channel events arrive in bursts: thousands of them during
+member chunking or a mass role edit. Writing each one on its own means a
+separate transaction per event, all fighting over SQLite's single writer.
+Instead, the event handlers queue what they want written, and a flusher
+writes it in bulk, coalescing everything queued for the same row.
+
+    * IngestMetrics - Dataclass recording the queue depth and flush latency of the ingestion queue
+    * IngestQueue - Class batching upserts and deletes of Discord models into bulk transactions
+    * ingest_queue - The ingestion queue used by the gateway event handlers
+"""
+from __future__ import annotations
+from asgiref.sync import sync_to_async
+import asyncio
+import collections
+import dataclasses
+from django.db import models, transaction
+import enum
+import typing as t
+
+from ...core.conf import Config
+from ...core.log import logging
+from ...lib.stats import percentile
+
+
+conf = Config.load()
+logger = logging.getLogger(conf.name).getChild("ingest")
+
+
+class Operation(enum.Enum):
+    UPSERT = "upsert"
+    DELETE = "delete"
+
+
+@dataclasses.dataclass
+class IngestMetrics:
+    enqueued: int = 0
+    coalesced: int = 0
+    written: int = 0
+    flushes: int = 0
+    failed: int = 0
+    max_depth: int = 0
+    # Seconds from the oldest operation in a batch being queued to it being committed.
+    latencies: t.Deque[float] = dataclasses.field(default_factory=lambda: collections.deque(maxlen=1024))
+
+    def percentile(self, percent: float) -> t.Optional[float]:
+        return percentile(self.latencies, percent)
+
+
+class IngestQueue:
+    """
+    Queue of model writes, flushed in bulk.
+
+    A batch is flushed `interval` seconds after its first operation was
+    queued, or as soon as it holds `max_batch` operations. Within a batch
+    only the last operation queued for a row counts, and every batch is
+    written in a single transaction.
+
+    Args:
+        interval (float): The longest time in seconds an operation waits
+            for others to join its batch.
+        max_batch (int): The most operations in a single batch.
+    """
+    def __init__(self, interval: float=0.25, max_batch: int=500) -> None:
+        self.interval: float = interval
+        self.max_batch: int = max_batch
+        self.metrics: IngestMetrics = IngestMetrics()
+        self._queue: t.Optional[asyncio.Queue] = None
+        self._task: t.Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return 0 if self._queue is None else self._queue.qsize()
+
+    def upsert(self, model: t.Type[models.Model], id: int, **fields: t.Any) -> None:
+        """Queue the creation of a row, or the update of its fields if it exists."""
+        self._put(Operation.UPSERT, model, id, fields)
+
+    def delete(self, model: t.Type[models.Model], id: int) -> None:
+        self._put(Operation.DELETE, model, id, {})
+
+    def _put(self, operation: Operation, model: t.Type[models.Model], id: int, fields: t.Dict[str, t.Any]) -> None:
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._flusher(), name="gateway-ingestion")
+
+        self._queue.put_nowait(((operation, model, int(id), fields), loop.time()))
+        self.metrics.enqueued += 1
+        self.metrics.max_depth = max(self.metrics.max_depth, self.depth)
+
+    async def _flusher(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: t.List) -> None:
+        loop = asyncio.get_running_loop()
+        operations = {}
+        for (operation, model, id, fields), _ in batch:
+            if (model, id) in operations:
+                self.metrics.coalesced += 1
+            operations[(model, id)] = (operation, fields)
+
+        self.metrics.flushes += 1
+        try:
+            written = await sync_to_async(_apply)(operations)
+        except Exception:
+            self.metrics.failed += len(operations)
+            logger.exception(f"Failed to write a batch of {len(operations)} gateway operation(s).")
+            return
+
+        self.metrics.written += written
+        self.metrics.latencies.append(loop.time() - min([queued_at for _, queued_at in batch]))
+
+    async def join(self) -> None:
+        """Wait until everything queued so far has been flushed."""
+        if self._queue is not None and self._task is not None and not self._task.done():
+            await self._queue.join()
+
+    async def close(self, timeout: float=5.0) -> None:
+        """Flush whatever is queued, within the timeout, and stop the flusher."""
+        try:
+            await asyncio.wait_for(self.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.depth} gateway operation(s) were not flushed within {timeout} seconds.")
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def _apply(operations: t.Dict[t.Tuple[t.Type[models.Model], int], t.Tuple[Operation, t.Dict[str, t.Any]]]) -> int:
+    """Write a batch of coalesced operations in one transaction, returning how many rows were written."""
+    from .models import Guild
+
+    upserts: t.Dict[t.Type[models.Model], t.Dict[int, t.Dict[str, t.Any]]] = {}
+    deletes: t.Dict[t.Type[models.Model], t.List[int]] = {}
+    for (model, id), (operation, fields) in operations.items():
+        if operation is Operation.UPSERT:
+            upserts.setdefault(model, {})[id] = fields
+        else:
+            deletes.setdefault(model, []).append(id)
+
+    written = 0
+    with transaction.atomic():
+        guild_ids = set([fields['guild_id'] for rows in upserts.values() for fields in rows.values() if 'guild_id' in fields])
+        guilds = set(Guild.objects.filter(id__in=list(guild_ids)).values_list("id", flat=True)) if guild_ids else set()
+
+        for model, rows in upserts.items():
+            # Rows of guilds which aren't stored would fail the foreign key check at commit.
+            rows = {id: fields for id, fields in rows.items() if fields.get('guild_id', None) in guilds or 'guild_id' not in fields}
+            if not rows:
+                continue
+
+            objs = [model(id=id, **fields) for id, fields in rows.items()]
+            update_fields = sorted(set([name for fields in rows.values() for name in fields.keys()]))
+            if update_fields:
+                model.objects.bulk_create(objs, update_conflicts=True, update_fields=update_fields, unique_fields=["id"])
+            else:
+                model.objects.bulk_create(objs, ignore_conflicts=True)
+            written += len(objs)
+
+        for model, ids in deletes.items():
+            model.objects.filter(id__in=ids).delete()
+            written += len(ids)
+    return written
+
+
+ingest_queue: IngestQueue = IngestQueue()
@@ -4,7 +4,53 @@ from ...core.models import BaseAsyncModel
 from ..fields import BaseIDField
 
 from asgiref.sync import sync_to_async
+import asyncio
 import inspect
+import typing as t
+
+
+# Rows fetched from the database per page when iterating asynchronously.
+ITER_CHUNK_SIZE: int = 1000
+# Rows resolved together when iterating with resolve=True, and how many
+# distinct IDs across them may be looked up at once.
+RESOLVE_CHUNK_SIZE: int = 100
+RESOLVE_CONCURRENCY: int = 16
+
+
+async def aresolve_many(bot, items, concurrency: int=RESOLVE_CONCURRENCY) -> None:
+    """
+    Resolve the Discord ID fields of every passed item at once.
+
+    Each distinct ID is only looked up once, however many items refer to
+    it, and the lookups run concurrently. A lookup which fails is stored
+    as the exception, the same way NotFoundErrors are.
+    """
+    if not items:
+        return
+
+    fields = items[0].get_id_fields()
+    lookups = {}
+    for item in items:
+        for field in fields:
+            id = getattr(item, field.attname)
+            if id is not None:
+                lookups.setdefault((field.__class__, id), field)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve(field, id):
+        async with semaphore:
+            return await field.aresolve(bot, id)
+
+    keys = list(lookups.keys())
+    results = await asyncio.gather(*[resolve(lookups[key], key[1]) for key in keys], return_exceptions=True)
+    resolved = dict(zip(keys, results))
+
+    for item in items:
+        item.attach_bot(bot)
+        for field in fields:
+            id = getattr(item, field.attname)
+            item._resolved[field.name] = None if id is None else resolved[(field.__class__, id)]
 
 
 def obj_inject_bot(func):
@@ -68,10 +114,76 @@ class DiscordQuerySet(models.query.QuerySet):
         self._bot = kwargs.pop('bot', None)
         self.only_valid = kwargs.pop('only_valid', [])
         self.resolve = kwargs.pop('resolve', False)
+        self.chunk_size = kwargs.pop('chunk_size', ITER_CHUNK_SIZE)
         super().__init__(*args, **kwargs)
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._bot = self._bot
+        clone.only_valid = self.only_valid
+        clone.resolve = self.resolve
+        clone.chunk_size = self.chunk_size
+        return clone
+
+    def chunked(self, chunk_size: int):
+        """Return a copy of this queryset which is fetched `chunk_size` rows at a time when iterated asynchronously."""
+        if chunk_size <= 0:
+            raise ValueError("The chunk size must be greater than 0.")
+        clone = self._chain()
+        clone.chunk_size = chunk_size
+        return clone
+
+    @staticmethod
+    def _fetch_page(page) -> list:
+        # This skips __iter__, which would resolve everything synchronously.
+        page._fetch_all()
+        return page._result_cache
+
+    async def achunks(self):
+        """
+        Fetch the rows of this queryset a page at a time, yielding each page.
+
+        Pages of unordered model querysets are keyed on the primary key, so
+        rows written to while iterating are neither skipped nor repeated.
+        Ordered querysets are paged by offset to keep their order. Anything
+        else, like values() querysets, sliced querysets and querysets which
+        were already evaluated, is fetched all at once.
+        """
+        streamable = (
+            self._result_cache is None
+            and not self.query.is_sliced
+            and not self._prefetch_related_lookups
+            and self._iterable_class is models.query.ModelIterable
+        )
+        if not streamable:
+            await sync_to_async(self._fetch_all)()
+            for start in range(0, len(self._result_cache), self.chunk_size):
+                yield self._result_cache[start:start + self.chunk_size]
+            return
+
+        last = None
+        offset = 0
+        while True:
+            if self.ordered:
+                page = self[offset:offset + self.chunk_size]
+                offset += self.chunk_size
+            else:
+                page = self.order_by("pk")
+                if last is not None:
+                    page = page.filter(pk__gt=last)
+                page = page[:self.chunk_size]
+
+            rows = await sync_to_async(self._fetch_page)(page)
+            if rows:
+                yield rows
+            if len(rows) < self.chunk_size:
+                return
+            last = rows[-1].pk
     
     def attach_bot_to(self, obj):
-        obj._bot = self._bot
+        # values() and values_list() rows are dicts and tuples, with no bot to attach.
+        if hasattr(obj, "_bot"):
+            obj._bot = self._bot
         return obj
     
     def __iter__(self):
@@ -80,19 +192,29 @@ class DiscordQuerySet(models.query.QuerySet):
             if hasattr(item, "_bot"):
                 item._bot = self._bot
                 if self.resolve is True:
-                    self.item.resolve_all()
+                    item.resolve_all()
             yield item
     
     def __aiter__(self):
         async def generator():
-            await sync_to_async(self._fetch_all)()
-            for item in self._result_cache:
-                item = self.attach_bot_to(item)
-                if self.resolve is True:
-                    await item.resolve_all()
-                    if any([isinstance(item._resolved[field], Exception) for field in self.only_valid]):
-                        continue
-                yield item
+            async for page in self.achunks():
+                if self._iterable_class is not models.query.ModelIterable:
+                    for item in page:
+                        yield item
+                    continue
+
+                items = [self.attach_bot_to(item) for item in page]
+
+                for start in range(0, len(items), RESOLVE_CHUNK_SIZE):
+                    chunk = items[start:start + RESOLVE_CHUNK_SIZE]
+                    if self.resolve is True:
+                        await aresolve_many(self._bot, chunk)
+
+                    for item in chunk:
+                        if self.resolve is True:
+                            if any([isinstance(item._resolved[field], Exception) for field in self.only_valid]):
+                                continue
+                        yield item
         return generator()
 
 
@@ -159,31 +281,33 @@ class DiscordBaseModel(BaseAsyncModel):
     def attach_bot(self, bot):
         self._bot = bot
     
+    @classmethod
+    def get_id_fields(cls) -> t.Tuple[BaseIDField, ...]:
+        """
+        Return the Discord ID fields of this model.
+
+        These are worked out the first time they're asked for, and kept on
+        the model class itself, so subclasses each get their own.
+        """
+        fields = cls.__dict__.get("_id_fields")
+        if fields is None:
+            fields = tuple([field for field in cls._meta.concrete_fields if isinstance(field, BaseIDField)])
+            cls._id_fields = fields
+        return fields
+
     async def aresolve_all(self, bot=None):
         if bot is not None:
             self.attach_bot(bot)
 
-        for name in self._get_field_expression_map(self._meta).keys():
-            if name == "pk":
-                continue
-            field = getattr(self.__class__, name)
-            if isinstance(field, property):
-                continue
-            else:
-                field = field.field
-            if isinstance(field, BaseIDField):
-                self._resolved[name] = await field.aresolve(self.bot, getattr(self, name))
+        for field in self.get_id_fields():
+            self._resolved[field.name] = await field.aresolve(self.bot, getattr(self, field.attname))
     
     def resolve_all(self, bot=None):
         if bot is not None:
             self.attach_bot(bot)
         
-        for name in self._get_field_expression_map(self._meta).keys():
-            if name == "pk":
-                continue
-            field = getattr(self.__class__, name).field
-            if isinstance(field, BaseIDField):
-                self._resolved[name] = field.resolve(self.bot, getattr(self, name))
+        for field in self.get_id_fields():
+            self._resolved[field.name] = field.resolve(self.bot, getattr(self, field.attname))
     
     async def aresolve(self, field_name, bot=None):
         if bot is not None:
@@ -1,5 +1,11 @@
+from __future__ import annotations
+from asgiref.sync import sync_to_async
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 import random
+import threading
+import typing as t
 
 from ..core.models import BaseAsyncModel
 
@@ -17,20 +23,67 @@ class PartOfSpeech(BaseAsyncModel):
         return f"{self.Type(self.type).label}: {self.value}"
 
 
-async def aget_threat() -> str:
-    verbs = []
-    async for verb in PartOfSpeech.objects.filter(
-        type=PartOfSpeech.Type.VERB
-    ):
-        verbs.append(verb)
-    
-    objects = []
-    async for object in PartOfSpeech.objects.filter(
-        type=PartOfSpeech.Type.DIRECT_OBJECT
-    ):
-        objects.append(object)
-    
-    verb = random.choice(verbs)
-    obj = random.choice(objects)
-    return f"or else I will {verb.value} {obj.value}."
-        
+class Vocabulary:
+    """
+    Process-wide cache of every part of speech, grouped by type.
+
+    The whole table is loaded once, and dropped again whenever a part of
+    speech is saved or deleted. Bulk operations skip those signals, so
+    anything using them should call `invalidate()` itself.
+    """
+    def __init__(self) -> None:
+        self._words: t.Optional[t.Dict[int, t.List[str]]] = None
+        self._generation: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._words = None
+            self._generation += 1
+
+    def load(self) -> t.Dict[int, t.List[str]]:
+        with self._lock:
+            if self._words is not None:
+                return self._words
+            generation = self._generation
+
+        words = {type: [] for type in PartOfSpeech.Type.values}
+        for type, value in PartOfSpeech.objects.values_list("type", "value"):
+            words.setdefault(type, []).append(value)
+
+        # Something changed while loading, so don't keep what may be stale.
+        with self._lock:
+            if generation == self._generation:
+                self._words = words
+        return words
+
+    async def aload(self) -> t.Dict[int, t.List[str]]:
+        words = self._words
+        if words is not None:
+            return words
+        return await sync_to_async(self.load)()
+
+    async def asample(self, type: PartOfSpeech.Type) -> t.Optional[str]:
+        """Return a random word of the passed type, or None if there are none."""
+        words = (await self.aload()).get(type)
+        if not words:
+            return None
+        return random.choice(words)
+
+
+vocabulary: Vocabulary = Vocabulary()
+
+
+async def aget_threat() -> t.Optional[str]:
+    """Return a random threat, or None if there aren't enough words to make one."""
+    verb = await vocabulary.asample(PartOfSpeech.Type.VERB)
+    obj = await vocabulary.asample(PartOfSpeech.Type.DIRECT_OBJECT)
+    if verb is None or obj is None:
+        return None
+    return f"or else I will {verb} {obj}."
+
+
+@receiver(post_save, sender=PartOfSpeech)
+@receiver(post_delete, sender=PartOfSpeech)
+def _on_part_of_speech_changed(sender, instance, **kwargs):
+    vocabulary.invalidate()